@@ -4,13 +4,19 @@ Flask Web Application for YouTube to MP3 Downloader
 Modern, tech-savvy UI for downloading YouTube videos and playlists
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import os
 import sys
 import json
+import zipfile
+from urllib.parse import quote
 from pathlib import Path
-from youtube_downloader import YouTubeDownloader
+from youtube_downloader import (
+    YouTubeDownloader, PlaylistWatcher, parse_playlist_items, format_playlist_items, count_playlist_items,
+    is_playlist_url, RETRYABLE_ERRORS
+)
+from job_store import open_job_store
 import threading
 import time
 
@@ -36,29 +42,294 @@ download_state = {
     'current_item_num': 0,
     'speed': 0,
     'eta': 0,
-    'error': None
+    'error': None,
+    'failed_items': [],
+    'item_progress': 0,
+    'items_done': 0,
+    'items_failed': 0,
+    'bytes_per_sec': 0,
+    'items_per_min': 0,
+    'item_states': '',
+    'wait': 0,
+    'retry_items': 0,
+    'profile': None
 }
 
 download_lock = threading.Lock()
 
+# Distributed mode: with YTDL_JOB_STORE set, downloads are queued in the shared
+# job store for worker.py processes instead of running inside this server
+job_store = open_job_store(os.environ['YTDL_JOB_STORE']) if os.environ.get('YTDL_JOB_STORE') else None
+last_job_id = None
+
 
 def progress_callback(data):
     """Callback for download progress updates"""
     global download_state
     with download_lock:
         if data.get('status') == 'downloading':
-            download_state['progress'] = data.get('percent', 0)
+            download_state['item_progress'] = data.get('percent', 0)
             download_state['status'] = 'downloading'
             download_state['speed'] = data.get('speed', 0)
-            download_state['eta'] = data.get('eta', 0)
         elif data.get('status') == 'converting':
             download_state['status'] = 'converting'
-            download_state['progress'] = 100
+            download_state['item_progress'] = 100
+        elif data.get('status') in ('throttled', 'retrying'):
+            download_state['status'] = data['status']
+            download_state['wait'] = round(data.get('wait', 0))
+            download_state['retry_items'] = data.get('retry_items', 0)
+        
+        # Job-wide progress across all items
+        job = data.get('job')
+        if job:
+            download_state['progress'] = job['percent']
+            download_state['eta'] = job['eta']
+            if job['total_items']:
+                download_state['total_items'] = job['total_items']
+            download_state['current_item_num'] = job['current_item_num']
+            if job['current_item']:
+                download_state['current_item'] = job['current_item']
+            download_state['items_done'] = job['items_done']
+            download_state['items_failed'] = job['items_failed']
+            download_state['bytes_per_sec'] = job['bytes_per_sec']
+            download_state['items_per_min'] = job['items_per_min']
+            download_state['item_states'] = job['item_states']
+
+
+def begin_download_state():
+    """
+    Claim download_state for a new download
+    
+    Returns:
+        False if another download is already in progress
+    """
+    with download_lock:
+        if download_state['active']:
+            return False
+        
+        download_state['active'] = True
+        download_state['progress'] = 0
+        download_state['status'] = 'starting'
+        download_state['error'] = None
+        download_state['current_item'] = ''
+        download_state['total_items'] = 0
+        download_state['current_item_num'] = 0
+        download_state['failed_items'] = []
+        download_state['item_progress'] = 0
+        download_state['items_done'] = 0
+        download_state['items_failed'] = 0
+        download_state['bytes_per_sec'] = 0
+        download_state['items_per_min'] = 0
+        download_state['item_states'] = ''
+        download_state['wait'] = 0
+        download_state['retry_items'] = 0
+        download_state['profile'] = None
+        return True
+
+
+def finish_download_state(result):
+    """Release download_state after a download completed"""
+    with download_lock:
+        download_state['active'] = False
+        download_state['failed_items'] = result.get('failed', [])
+        download_state['profile'] = result.get('profile')
+        download_state['status'] = 'idle'  # Changed to 'idle' to stop polling loop
+        download_state['progress'] = 0
+        download_state['current_item'] = ''
+        download_state['total_items'] = 0
+        download_state['speed'] = 0
+        download_state['eta'] = 0
+        download_state['item_progress'] = 0
+        download_state['bytes_per_sec'] = 0
+        download_state['items_per_min'] = 0
+        download_state['item_states'] = ''
+
+
+def fail_download_state(error):
+    """Release download_state after a download failed"""
+    with download_lock:
+        download_state['active'] = False
+        download_state['status'] = 'error'
+        download_state['error'] = str(error)
 
 
 # Global variable to store selected downloads folder
 selected_downloads_folder = None
 
+# Background playlist watcher (created on first use)
+playlist_watcher = None
+watcher_lock = threading.Lock()
+
+# Read size used when streaming files into a ZIP export
+EXPORT_CHUNK_SIZE = 1024 * 1024
+
+
+def resolve_downloads_path(output_dir=None):
+    """Resolve the downloads folder for a request's optional 'dir' parameter"""
+    if output_dir is None or output_dir == 'downloads':
+        if selected_downloads_folder:
+            return Path(selected_downloads_folder)
+        from youtube_downloader import get_default_downloads_dir
+        return get_default_downloads_dir()
+    return Path(output_dir)
+
+
+def watcher_download(url, title, entries, playlist_count):
+    """
+    Download a watched playlist's new entries
+    
+    Goes through the same download_state gate as /api/download, so watcher
+    downloads never overlap a user's download and show up in /api/status.
+    """
+    while not begin_download_state():
+        # Wait for the user's download to finish
+        if playlist_watcher.stop_event.wait(5):
+            raise Exception("Watcher stopped")
+    with download_lock:
+        download_state['total_items'] = len(entries)
+    try:
+        result = playlist_watcher.downloader.download_entries(title, entries, playlist_count)
+    except Exception as e:
+        fail_download_state(e)
+        raise
+    finish_download_state(result)
+    return result
+
+
+def enqueue_watched_entries(url, title, entries, playlist_count):
+    """
+    Queue a watched playlist's new entries in the shared job store for the workers
+    
+    Entries are queued by video URL. Those still queued or leased from an earlier
+    poll are not queued again, and entries whose items ran out of retries are
+    queued afresh, like the next poll retries them in the in-process watcher.
+    """
+    states = job_store.get_entry_states(url, [entry['id'] for index, entry in entries])
+    pending = []
+    queue = []
+    for index, entry in entries:
+        state = states.get(entry['id'])
+        if state is not None and state['status'] in ('queued', 'leased'):
+            pending.append(entry['id'])
+        elif state is None or (state['status'] == 'failed'
+                               and state['error_class'] in RETRYABLE_ERRORS | {'abandoned'}):
+            queue.append((index, entry['id'], entry['url']))
+            pending.append(entry['id'])
+        # Otherwise the entry was downloaded, or is unavailable for good
+    if queue:
+        job_store.enqueue_job(
+            url,
+            output_dir=str(resolve_downloads_path()),
+            is_playlist=True,
+            entries=queue,
+            title=title,
+            playlist_count=playlist_count
+        )
+    # Pending entries stay out of the snapshot until their items are done
+    return {'failed': [], 'pending': pending}
+
+
+def get_playlist_watcher():
+    """Return the playlist watcher, starting its scheduler thread on first use"""
+    global playlist_watcher
+    with watcher_lock:
+        if playlist_watcher is None:
+            if job_store is not None:
+                # Distributed mode: new entries go to the workers, nothing downloads in this process
+                downloads_path = resolve_downloads_path()
+                downloads_path.mkdir(parents=True, exist_ok=True)
+                playlist_watcher = PlaylistWatcher(
+                    None,
+                    state_file=downloads_path / PlaylistWatcher.STATE_FILENAME,
+                    download=enqueue_watched_entries
+                )
+            else:
+                downloader = YouTubeDownloader(output_dir=str(resolve_downloads_path()))
+                downloader.set_progress_callback(progress_callback)
+                playlist_watcher = PlaylistWatcher(downloader, download=watcher_download)
+            thread = threading.Thread(target=playlist_watcher.run, daemon=True)
+            thread.start()
+        return playlist_watcher
+
+
+def start_playlist_watcher(downloads_folder=None):
+    """Resume watching the playlists saved by a previous session when the server starts"""
+    global selected_downloads_folder
+    if downloads_folder:
+        selected_downloads_folder = downloads_folder
+    try:
+        get_playlist_watcher()
+    except Exception as e:
+        print(f"Playlist watcher not started: {e}")
+
+
+class ZipStreamSink:
+    """
+    Write-only, unseekable file object for zipfile.
+    
+    zipfile falls back to data descriptors when it cannot seek, so every
+    byte it writes can be handed to the client straight away. Only the
+    chunks written since the last drain() are kept in memory.
+    """
+    
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._offset
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        """Return and forget everything written since the last call"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip_stream(files, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Generate a stored (uncompressed) ZIP archive chunk by chunk
+    
+    Args:
+        files: Iterable of (full_path, arcname) tuples
+        chunk_size: Number of bytes read from each file at a time
+    
+    Yields:
+        Bytes of the archive, in order
+    """
+    sink = ZipStreamSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for full_path, arcname in files:
+            zinfo = zipfile.ZipInfo.from_file(full_path, arcname)
+            zinfo.compress_type = zipfile.ZIP_STORED
+            with open(full_path, 'rb') as src, zf.open(zinfo, mode='w') as dst:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # Central directory is written when the archive is closed
+    data = sink.drain()
+    if data:
+        yield data
+
 @app.route('/')
 def index():
     """Main page"""
@@ -115,6 +386,55 @@ def get_info():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/info/batch', methods=['POST'])
+def get_info_batch():
+    """
+    Get information for many URLs at once
+    
+    Streams one JSON object per line (NDJSON) as each lookup completes,
+    followed by a summary line with 'done': true.
+    """
+    try:
+        data = request.json or {}
+        urls = data.get('urls') or []
+        max_workers = data.get('max_workers', 4)
+        
+        if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+            return jsonify({'error': 'urls must be a list of URLs'}), 400
+        urls = [url.strip() for url in urls if url.strip()]
+        if not urls:
+            return jsonify({'error': 'At least one URL is required'}), 400
+        try:
+            max_workers = max(1, min(16, int(max_workers)))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'max_workers must be a number'}), 400
+        
+        downloader = YouTubeDownloader()
+        
+        def generate():
+            started = time.perf_counter()
+            resolved = failed = 0
+            for result in downloader.get_video_info_batch(urls, max_workers=max_workers):
+                resolved += 1
+                if not result['success']:
+                    failed += 1
+                yield json.dumps(result) + '\n'
+            yield json.dumps({
+                'done': True,
+                'requested': len(urls),
+                'resolved': resolved,
+                'failed': failed,
+                'seconds': round(time.perf_counter() - started, 3)
+            }) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except Exception as e:
+        error_msg = str(e)
+        if 'ffmpeg' in error_msg.lower() or 'ffprobe' in error_msg.lower():
+            return jsonify({'error': error_msg, 'ffmpeg_error': True}), 500
+        return jsonify({'error': error_msg}), 500
+
+
 @app.route('/api/download', methods=['POST'])
 def download():
     """Start download process"""
@@ -125,23 +445,26 @@ def download():
         url = data.get('url', '').strip()
         bitrate = data.get('bitrate', '172k')
         output_dir = data.get('output_dir', None)  # None will use default (user-writable location)
-        selected_indices = data.get('selected_indices', None)  # List of selected playlist indices
+        selected_indices = data.get('selected_indices', None)  # Selected playlist indices: list or ranges like "1-200,305"
+        staging_dir = data.get('staging_dir', None)  # Optional local scratch directory
+        profile = bool(data.get('profile', False))  # Save profiling artifacts for this job
+        normalize = bool(data.get('normalize', False))  # Two-pass loudness normalization
         
         if not url:
             return jsonify({'error': 'URL is required'}), 400
         
+        if selected_indices:
+            try:
+                selected_indices = parse_playlist_items(selected_indices)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid playlist selection'}), 400
+        
+        if job_store is not None:
+            return enqueue_download(url, bitrate, output_dir, selected_indices, staging_dir, profile, normalize)
+        
         # Check if download is already in progress
-        with download_lock:
-            if download_state['active']:
-                return jsonify({'error': 'Download already in progress'}), 400
-            
-            download_state['active'] = True
-            download_state['progress'] = 0
-            download_state['status'] = 'starting'
-            download_state['error'] = None
-            download_state['current_item'] = ''
-            download_state['total_items'] = 0
-            download_state['current_item_num'] = 0
+        if not begin_download_state():
+            return jsonify({'error': 'Download already in progress'}), 400
         
         # Start download in background thread
         def download_thread():
@@ -159,7 +482,9 @@ def download():
                 
                 downloader = YouTubeDownloader(
                     output_dir=actual_output_dir,
-                    bitrate=bitrate
+                    bitrate=bitrate,
+                    staging_dir=staging_dir,
+                    normalize=normalize
                 )
                 downloader.set_progress_callback(progress_callback)
                 
@@ -168,7 +493,7 @@ def download():
                 
                 # Determine total items count
                 if selected_indices and info.get('type') == 'playlist':
-                    total_count = len(selected_indices)
+                    total_count = count_playlist_items(selected_indices)
                 else:
                     total_count = info.get('count', 1)
                 
@@ -180,23 +505,14 @@ def download():
                 result = downloader.download(
                     url, 
                     progress_callback=progress_callback,
-                    selected_indices=selected_indices
+                    selected_indices=selected_indices,
+                    profile=profile
                 )
                 
-                with download_lock:
-                    download_state['active'] = False
-                    download_state['status'] = 'idle'  # Changed to 'idle' to stop polling loop
-                    download_state['progress'] = 0
-                    download_state['current_item'] = ''
-                    download_state['total_items'] = 0
-                    download_state['speed'] = 0
-                    download_state['eta'] = 0
+                finish_download_state(result)
                     
             except Exception as e:
-                with download_lock:
-                    download_state['active'] = False
-                    download_state['status'] = 'error'
-                    download_state['error'] = str(e)
+                fail_download_state(e)
         
         thread = threading.Thread(target=download_thread, daemon=True)
         thread.start()
@@ -211,14 +527,90 @@ def download():
         return jsonify({'error': str(e)}), 500
 
 
+def enqueue_download(url, bitrate, output_dir, selected_indices, staging_dir=None, profile=False, normalize=False):
+    """Queue a download in the shared job store for the workers"""
+    global last_job_id
+    job_id = job_store.enqueue_job(
+        url,
+        bitrate=bitrate,
+        output_dir=str(resolve_downloads_path(output_dir)),
+        is_playlist=is_playlist_url(url),
+        selected_indices=format_playlist_items(selected_indices) if selected_indices else None,
+        staging_dir=staging_dir,
+        profile=profile,
+        normalize=normalize
+    )
+    last_job_id = job_id
+    return jsonify({'success': True, 'message': 'Download queued', 'job_id': job_id})
+
+
+def job_status(job):
+    """Present a queued job in the same shape as download_state"""
+    counts = job['counts']
+    finished = counts['done'] + counts['failed']
+    total = job['total_items']
+    status = dict(download_state)
+    if job['active']:
+        status.update({
+            'active': True,
+            'status': 'downloading' if counts['leased'] else 'starting',
+            'progress': finished * 100 / total if total else 0,
+            'current_item': job['title'],
+            'total_items': total,
+            'current_item_num': finished,
+            'items_done': counts['done'],
+            'items_failed': counts['failed'],
+        })
+    else:
+        status.update({
+            'active': False,
+            'status': 'idle',
+            'progress': 0,
+            'failed_items': job['failed_items'],
+        })
+    status['job_id'] = job['id']
+    return status
+
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get current download status"""
     global download_state
+    if job_store is not None and last_job_id is not None:
+        job = job_store.get_job(last_job_id)
+        if job is not None:
+            with download_lock:
+                return jsonify(job_status(job))
     with download_lock:
         return jsonify(download_state.copy())
 
 
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List jobs in the shared job store (distributed mode)"""
+    if job_store is None:
+        return jsonify({'error': 'No job store configured (set YTDL_JOB_STORE)'}), 404
+    try:
+        limit = max(1, min(500, int(request.args.get('limit', 50))))
+        return jsonify({'jobs': job_store.list_jobs(limit=limit)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get one job's status with its failed items (distributed mode)"""
+    if job_store is None:
+        return jsonify({'error': 'No job store configured (set YTDL_JOB_STORE)'}), 404
+    try:
+        job = job_store.get_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/downloads', methods=['GET'])
 def list_downloads():
     """List downloaded files"""
@@ -289,6 +681,116 @@ def download_file():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/watch', methods=['GET'])
+def list_watched_playlists():
+    """List watched playlists with the cost of their last poll"""
+    try:
+        watcher = get_playlist_watcher()
+        return jsonify({'playlists': watcher.get_playlists()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/watch', methods=['POST'])
+def add_watched_playlist():
+    """Start watching a playlist for new videos"""
+    try:
+        data = request.json or {}
+        url = data.get('url', '').strip()
+        interval = data.get('interval', None)  # Minutes between polls
+        
+        if not url:
+            return jsonify({'error': 'URL is required'}), 400
+        if interval is not None:
+            try:
+                interval = float(interval)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Interval must be a number of minutes'}), 400
+            if interval <= 0:
+                return jsonify({'error': 'Interval must be a number of minutes'}), 400
+        
+        watcher = get_playlist_watcher()
+        watcher.add_playlist(url, interval=interval)
+        return jsonify({'success': True, 'playlists': watcher.get_playlists()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/watch', methods=['DELETE'])
+def remove_watched_playlist():
+    """Stop watching a playlist"""
+    try:
+        data = request.json or {}
+        url = data.get('url', '').strip()
+        
+        if not url:
+            return jsonify({'error': 'URL is required'}), 400
+        
+        watcher = get_playlist_watcher()
+        if not watcher.remove_playlist(url):
+            return jsonify({'error': 'Playlist is not being watched'}), 404
+        return jsonify({'success': True, 'playlists': watcher.get_playlists()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/export', methods=['GET', 'POST'])
+def export_zip():
+    """Stream a playlist folder or a set of downloaded files as a ZIP archive"""
+    try:
+        if request.method == 'POST':
+            data = request.json or {}
+        else:
+            data = request.args
+            
+        folder = data.get('folder', '')
+        output_dir = data.get('dir', None)
+        if request.method == 'POST':
+            paths = data.get('paths') or []
+            if not isinstance(paths, list):
+                return jsonify({'error': 'paths must be a list of file paths'}), 400
+        else:
+            paths = request.args.getlist('path')
+        
+        if not folder and not paths:
+            return jsonify({'error': 'A folder or a list of file paths is required'}), 400
+        
+        download_path = resolve_downloads_path(output_dir).resolve()
+        
+        def is_inside_downloads(path):
+            return path == download_path or download_path in path.parents
+        
+        files = []
+        if folder:
+            folder_path = (download_path / folder).resolve()
+            if not is_inside_downloads(folder_path) or not folder_path.is_dir():
+                return jsonify({'error': 'Folder not found'}), 404
+            for item in sorted(folder_path.rglob('*.mp3')):
+                files.append((str(item), str(item.relative_to(folder_path.parent))))
+            archive_name = folder_path.name or 'downloads'
+        else:
+            for file_path in paths:
+                if not isinstance(file_path, str):
+                    return jsonify({'error': 'paths must be a list of file paths'}), 400
+                full_path = (download_path / file_path).resolve()
+                if (not is_inside_downloads(full_path) or not full_path.is_file()
+                        or full_path.suffix.lower() != '.mp3'):
+                    return jsonify({'error': f'File not found: {file_path}'}), 404
+                files.append((str(full_path), str(full_path.relative_to(download_path))))
+            archive_name = 'downloads'
+        
+        if not files:
+            return jsonify({'error': 'No files to export'}), 404
+        
+        return Response(
+            stream_with_context(iter_zip_stream(files)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f"attachment; filename*=UTF-8''{quote(archive_name + '.zip')}"}
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 if __name__ == '__main__':
     # Get default downloads directory (user-writable location)
     from youtube_downloader import get_default_downloads_dir
@@ -298,9 +800,16 @@ if __name__ == '__main__':
     print("YouTube to MP3 Downloader - Web Interface")
     print("="*60)
     print(f"Downloads folder: {default_downloads}")
+    if job_store is not None:
+        print(f"Job store: {os.environ['YTDL_JOB_STORE']} (downloads are queued for worker.py)")
     print("Starting server on http://localhost:5000")
     print("Press Ctrl+C to stop")
     print("="*60 + "\n")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    debug = True
+    # The debug reloader runs this module twice; only the serving process watches playlists
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_playlist_watcher()
+    
+    app.run(debug=debug, host='0.0.0.0', port=5000)
 
@@ -23,7 +23,7 @@ except ImportError:
     sys.exit(1)
 
 # Import Flask app
-from app import app as flask_app
+from app import app as flask_app, start_playlist_watcher
 
 
 class YouTubeDownloaderApp(QMainWindow):
@@ -115,6 +115,9 @@ class YouTubeDownloaderApp(QMainWindow):
         
     def start_flask_server(self):
         """Start Flask server in a separate thread"""
+        # Resume watching playlists before the page is first loaded
+        start_playlist_watcher(self.downloads_folder)
+        
         def run_server():
             flask_app.run(host='127.0.0.1', port=5000, debug=False, use_reloader=False)
         
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Shared job store for distributed download workers
+Queues playlist items so several worker processes or hosts can drain one queue
+"""
+
+import os
+import time
+import random
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+
+class JobStore(ABC):
+    """
+    Interface for job store backends.
+    
+    A job is one URL with its settings; its work is split into items (one per
+    playlist entry, or a single item for a video). Workers lease items for a
+    limited time, extend the lease with heartbeats while working, and mark
+    them done or failed. Leases that expire (a worker died) are reclaimed by
+    the next worker asking for work.
+    """
+    
+    # Leases an item may use up before it is given up on
+    MAX_LEASES = 3
+    # Delay before a failed item becomes available again: base * 2^(leases-1), with jitter
+    REQUEUE_BASE_DELAY = 60
+    # Circuit breaker cooldown after repeated throttling: base * 2^(strikes-1), capped, with jitter
+    BREAKER_BASE_COOLDOWN = 30
+    BREAKER_MAX_COOLDOWN = 600
+    
+    @abstractmethod
+    def enqueue_job(self, url, bitrate='172k', output_dir=None, is_playlist=False, selected_indices=None,
+                    staging_dir=None, profile=False, normalize=False, entries=None, title=None,
+                    playlist_count=None):
+        """
+        Add a job and its first item; returns the job ID
+        
+        A playlist starts with an 'expand' item: the worker leasing it lists the
+        playlist and replaces it with one item per selected entry using expand_item().
+        selected_indices is a playlist_items string such as "1-200,305";
+        staging_dir, profile and normalize are applied by the worker to every item.
+        
+        A playlist whose entries are already listed can pass them as entries,
+        (playlist index, video ID, video URL) tuples, with the playlist's title
+        and playlist_count; they are queued directly, without an 'expand' item.
+        """
+    
+    @abstractmethod
+    def expand_item(self, item_id, worker_id, entries, title=None, playlist_count=None):
+        """
+        Complete a leased 'expand' item by adding its playlist entries to the job
+        
+        entries are (playlist index, video ID, video URL) tuples. Adding them and
+        completing the item happen atomically; returns False, adding nothing,
+        if the lease has been lost.
+        """
+    
+    @abstractmethod
+    def get_entry_states(self, url, video_ids):
+        """
+        Return the state of the latest item for each of a playlist's videos
+        
+        Looks through every job for url; returns a dict of video ID to a dict with
+        the item's 'status' and 'error_class', leaving out videos never queued.
+        """
+    
+    @abstractmethod
+    def lease_item(self, worker_id, lease_seconds):
+        """Lease the next available item; returns a dict with item and job fields, or None"""
+    
+    @abstractmethod
+    def heartbeat(self, item_id, worker_id, lease_seconds):
+        """Extend a lease; returns False if the lease has been lost"""
+    
+    @abstractmethod
+    def complete_item(self, item_id, worker_id, title=None):
+        """Mark a leased item as done"""
+    
+    @abstractmethod
+    def fail_item(self, item_id, worker_id, error, error_class, retryable=False):
+        """Mark a leased item as failed, or requeue it with a delay when retryable"""
+    
+    @abstractmethod
+    def get_job(self, job_id):
+        """Return a job with its item counts and failed items, or None"""
+    
+    @abstractmethod
+    def list_jobs(self, limit=50):
+        """Return the most recent jobs with their item counts"""
+    
+    @abstractmethod
+    def has_pending(self):
+        """Whether any item is still queued or leased"""
+    
+    @abstractmethod
+    def record_throttle(self, name):
+        """Open the named circuit breaker for every worker; returns the cooldown in seconds"""
+    
+    @abstractmethod
+    def record_success(self, name):
+        """Let the named circuit breaker's cooldown shrink again"""
+    
+    @abstractmethod
+    def breaker_open_until(self, name):
+        """Wall-clock time until which the named circuit breaker is open (0 if closed)"""
+    
+    def requeue_delay(self, leases):
+        """Backoff before a requeued item may be leased again"""
+        delay = self.REQUEUE_BASE_DELAY * 2 ** max(0, leases - 1)
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def breaker_cooldown(self, strikes):
+        """Cooldown after the given number of throttling strikes"""
+        cooldown = min(self.BREAKER_MAX_COOLDOWN, self.BREAKER_BASE_COOLDOWN * 2 ** max(0, strikes - 1))
+        return cooldown / 2 + random.uniform(0, cooldown / 2)
+
+
+class StoreCircuitBreaker:
+    """
+    Circuit breaker kept in a JobStore.
+    
+    Same interface as youtube_downloader.CircuitBreaker, but the state is
+    shared by every worker using the store, so throttling seen by one
+    worker pauses all of them.
+    """
+    
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+    
+    def record_throttle(self):
+        """Open the breaker; returns the cooldown in seconds"""
+        return self.store.record_throttle(self.name)
+    
+    def record_success(self):
+        self.store.record_success(self.name)
+    
+    def wait(self):
+        """Block until the breaker is closed"""
+        while True:
+            remaining = self.store.breaker_open_until(self.name) - time.time()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, 5))
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store backed by a single SQLite file.
+    
+    Every claim runs in an IMMEDIATE transaction, so concurrent workers never
+    lease the same item. The default rollback journal is used rather than WAL
+    because WAL does not work on network shares.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            bitrate TEXT NOT NULL,
+            output_dir TEXT,
+            staging_dir TEXT,
+            profile INTEGER NOT NULL DEFAULT 0,
+            normalize INTEGER NOT NULL DEFAULT 0,
+            is_playlist INTEGER NOT NULL,
+            playlist_items TEXT,
+            playlist_count INTEGER,
+            title TEXT NOT NULL DEFAULT '',
+            created_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL REFERENCES jobs(id),
+            kind TEXT NOT NULL,
+            playlist_index INTEGER,
+            video_id TEXT,
+            video_url TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            lease_owner TEXT,
+            lease_expires REAL,
+            available_at REAL NOT NULL DEFAULT 0,
+            leases INTEGER NOT NULL DEFAULT 0,
+            title TEXT NOT NULL DEFAULT '',
+            error TEXT,
+            error_class TEXT,
+            updated_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS breakers (
+            name TEXT PRIMARY KEY,
+            strikes INTEGER NOT NULL DEFAULT 0,
+            open_until REAL NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS items_by_status ON items (status, available_at);
+        CREATE INDEX IF NOT EXISTS items_by_job ON items (job_id, status);
+    """
+    
+    def __init__(self, path, timeout=30):
+        self.path = os.path.abspath(path)
+        self.timeout = timeout
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self.connect()
+        try:
+            conn.executescript(self.SCHEMA)
+        finally:
+            conn.close()
+    
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    @contextmanager
+    def transaction(self):
+        """Run statements in a write transaction that excludes other writers"""
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+    
+    def enqueue_job(self, url, bitrate='172k', output_dir=None, is_playlist=False, selected_indices=None,
+                    staging_dir=None, profile=False, normalize=False, entries=None, title=None,
+                    playlist_count=None):
+        now = time.time()
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                """INSERT INTO jobs (url, bitrate, output_dir, staging_dir, profile, normalize,
+                                      is_playlist, playlist_items, playlist_count, title, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (url, bitrate, output_dir, staging_dir, int(profile), int(normalize),
+                 int(is_playlist), selected_indices if is_playlist else None, playlist_count,
+                 title or '', now)
+            )
+            job_id = cursor.lastrowid
+            if entries is not None:
+                conn.executemany(
+                    """INSERT INTO items (job_id, kind, playlist_index, video_id, video_url, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    [(job_id, 'item', index, video_id, video_url, now) for index, video_id, video_url in entries]
+                )
+            else:
+                # The first worker to lease an 'expand' item lists the playlist and adds its entries
+                conn.execute(
+                    'INSERT INTO items (job_id, kind, updated_at) VALUES (?, ?, ?)',
+                    (job_id, 'expand' if is_playlist else 'item', now)
+                )
+        return job_id
+    
+    def expand_item(self, item_id, worker_id, entries, title=None, playlist_count=None):
+        now = time.time()
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                """UPDATE items SET status = 'done', lease_owner = NULL, lease_expires = NULL,
+                   error = NULL, error_class = NULL, updated_at = ?
+                   WHERE id = ? AND lease_owner = ? AND status = 'leased'""",
+                (now, item_id, worker_id)
+            )
+            if cursor.rowcount != 1:
+                return False  # Lease lost; whoever holds it now expands the playlist
+            job_id = conn.execute('SELECT job_id FROM items WHERE id = ?', (item_id,)).fetchone()['job_id']
+            conn.executemany(
+                """INSERT INTO items (job_id, kind, playlist_index, video_id, video_url, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [(job_id, 'item', index, video_id, video_url, now) for index, video_id, video_url in entries]
+            )
+            conn.execute(
+                'UPDATE jobs SET title = COALESCE(?, title), playlist_count = COALESCE(?, playlist_count) WHERE id = ?',
+                (title, playlist_count, job_id)
+            )
+        return True
+    
+    def get_entry_states(self, url, video_ids):
+        wanted = set(video_ids)
+        conn = self.connect()
+        try:
+            states = {}
+            for row in conn.execute(
+                """SELECT items.video_id, items.status, items.error_class
+                   FROM items JOIN jobs ON jobs.id = items.job_id
+                   WHERE jobs.url = ? AND items.video_id IS NOT NULL ORDER BY items.id""",
+                (url,)
+            ):
+                if row['video_id'] in wanted:
+                    states[row['video_id']] = {'status': row['status'], 'error_class': row['error_class']}
+            return states
+        finally:
+            conn.close()
+    
+    def lease_item(self, worker_id, lease_seconds):
+        now = time.time()
+        with self.transaction() as conn:
+            while True:
+                row = conn.execute(
+                    """SELECT id, leases FROM items
+                       WHERE (status = 'queued' AND available_at <= ?)
+                          OR (status = 'leased' AND lease_expires < ?)
+                       ORDER BY id LIMIT 1""",
+                    (now, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row['leases'] >= self.MAX_LEASES:
+                    # Every lease so far has expired or failed: give up on it
+                    conn.execute(
+                        """UPDATE items SET status = 'failed', lease_owner = NULL, lease_expires = NULL,
+                           error = COALESCE(error, 'Lease expired too many times'),
+                           error_class = COALESCE(error_class, 'abandoned'), updated_at = ?
+                           WHERE id = ?""",
+                        (now, row['id'])
+                    )
+                    continue
+                conn.execute(
+                    """UPDATE items SET status = 'leased', lease_owner = ?, lease_expires = ?,
+                       leases = leases + 1, updated_at = ? WHERE id = ?""",
+                    (worker_id, now + lease_seconds, now, row['id'])
+                )
+                item = conn.execute(
+                    """SELECT items.id, items.job_id, items.kind, items.playlist_index, items.video_id,
+                              items.video_url, items.leases, jobs.url, jobs.bitrate, jobs.output_dir,
+                              jobs.staging_dir, jobs.profile, jobs.normalize, jobs.is_playlist,
+                              jobs.playlist_items, jobs.playlist_count, jobs.title
+                       FROM items JOIN jobs ON jobs.id = items.job_id WHERE items.id = ?""",
+                    (row['id'],)
+                ).fetchone()
+                return dict(item)
+    
+    def heartbeat(self, item_id, worker_id, lease_seconds):
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                """UPDATE items SET lease_expires = ?, updated_at = ?
+                   WHERE id = ? AND lease_owner = ? AND status = 'leased'""",
+                (time.time() + lease_seconds, time.time(), item_id, worker_id)
+            )
+            return cursor.rowcount == 1
+    
+    def complete_item(self, item_id, worker_id, title=None):
+        with self.transaction() as conn:
+            conn.execute(
+                """UPDATE items SET status = 'done', lease_owner = NULL, lease_expires = NULL,
+                   title = COALESCE(?, title), error = NULL, error_class = NULL, updated_at = ?
+                   WHERE id = ? AND lease_owner = ? AND status = 'leased'""",
+                (title, time.time(), item_id, worker_id)
+            )
+    
+    def fail_item(self, item_id, worker_id, error, error_class, retryable=False):
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT leases FROM items WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (item_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return  # Lease lost; whoever holds it now decides
+            if retryable and row['leases'] < self.MAX_LEASES:
+                status, available_at = 'queued', now + self.requeue_delay(row['leases'])
+            else:
+                status, available_at = 'failed', 0
+            conn.execute(
+                """UPDATE items SET status = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL,
+                   error = ?, error_class = ?, updated_at = ? WHERE id = ?""",
+                (status, available_at, error, error_class, now, item_id)
+            )
+    
+    def job_summary(self, conn, job):
+        counts = {status: 0 for status in ('queued', 'leased', 'done', 'failed')}
+        for row in conn.execute(
+            "SELECT status, COUNT(*) AS n FROM items WHERE job_id = ? AND kind = 'item' GROUP BY status",
+            (job['id'],)
+        ):
+            counts[row['status']] = row['n']
+        expanding = conn.execute(
+            "SELECT COUNT(*) FROM items WHERE job_id = ? AND kind = 'expand' AND status IN ('queued', 'leased')",
+            (job['id'],)
+        ).fetchone()[0]
+        return {
+            'id': job['id'],
+            'url': job['url'],
+            'title': job['title'],
+            'bitrate': job['bitrate'],
+            'output_dir': job['output_dir'],
+            'staging_dir': job['staging_dir'],
+            'profile': bool(job['profile']),
+            'normalize': bool(job['normalize']),
+            'type': 'playlist' if job['is_playlist'] else 'video',
+            'created_at': job['created_at'],
+            'total_items': sum(counts.values()),
+            'counts': counts,
+            'active': bool(expanding or counts['queued'] or counts['leased']),
+        }
+    
+    def get_job(self, job_id):
+        conn = self.connect()
+        try:
+            job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if job is None:
+                return None
+            summary = self.job_summary(conn, job)
+            summary['failed_items'] = [{
+                'id': row['video_id'] or str(row['id']),
+                'index': row['playlist_index'],
+                'title': row['title'],
+                'error': row['error'],
+                'error_class': row['error_class'],
+                'attempts': row['leases'],
+            } for row in conn.execute(
+                "SELECT * FROM items WHERE job_id = ? AND status = 'failed' ORDER BY id", (job_id,)
+            )]
+            return summary
+        finally:
+            conn.close()
+    
+    def list_jobs(self, limit=50):
+        conn = self.connect()
+        try:
+            jobs = conn.execute('SELECT * FROM jobs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+            return [self.job_summary(conn, job) for job in jobs]
+        finally:
+            conn.close()
+    
+    def has_pending(self):
+        conn = self.connect()
+        try:
+            return conn.execute(
+                "SELECT 1 FROM items WHERE status IN ('queued', 'leased') LIMIT 1"
+            ).fetchone() is not None
+        finally:
+            conn.close()
+    
+    def record_throttle(self, name):
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute('SELECT strikes, open_until FROM breakers WHERE name = ?', (name,)).fetchone()
+            strikes = (row['strikes'] if row else 0) + 1
+            cooldown = self.breaker_cooldown(strikes)
+            open_until = max(row['open_until'] if row else 0, now + cooldown)
+            conn.execute(
+                'INSERT OR REPLACE INTO breakers (name, strikes, open_until) VALUES (?, ?, ?)',
+                (name, strikes, open_until)
+            )
+        return cooldown
+    
+    def record_success(self, name):
+        with self.transaction() as conn:
+            conn.execute('UPDATE breakers SET strikes = MAX(0, strikes - 1) WHERE name = ? AND strikes > 0', (name,))
+    
+    def breaker_open_until(self, name):
+        conn = self.connect()
+        try:
+            row = conn.execute('SELECT open_until FROM breakers WHERE name = ?', (name,)).fetchone()
+            return row['open_until'] if row else 0
+        finally:
+            conn.close()
+
+
+# Backends by URL scheme, e.g. "sqlite:///mnt/share/jobs.db"
+JOB_STORE_BACKENDS = {
+    'sqlite': SQLiteJobStore,
+}
+
+
+def open_job_store(location):
+    """
+    Open a job store from a location string
+    
+    Args:
+        location: "<scheme>://<path>" for a registered backend, or a plain path to a SQLite file
+    """
+    if '://' in location:
+        scheme, path = location.split('://', 1)
+        if scheme not in JOB_STORE_BACKENDS:
+            raise Exception(f"Unknown job store backend: {scheme}")
+        return JOB_STORE_BACKENDS[scheme](path)
+    return SQLiteJobStore(location)
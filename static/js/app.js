@@ -35,7 +35,72 @@ const deselectAllBtn = document.getElementById('deselectAllBtn');
 const selectedCount = document.getElementById('selectedCount');
 
 let currentPlaylistInfo = null;
-let selectedIndices = new Set();
+
+// Compact selection state: one bit per playlist index
+class SelectionBitset {
+    constructor(size = 0) {
+        this.words = new Uint32Array((size >>> 5) + 1);
+        this.size = 0;
+    }
+    
+    has(index) {
+        const word = index >>> 5;
+        return word < this.words.length && (this.words[word] & (1 << (index & 31))) !== 0;
+    }
+    
+    add(index) {
+        if (this.has(index)) return;
+        const word = index >>> 5;
+        if (word >= this.words.length) {
+            const words = new Uint32Array(word + 1);
+            words.set(this.words);
+            this.words = words;
+        }
+        this.words[word] |= 1 << (index & 31);
+        this.size++;
+    }
+    
+    delete(index) {
+        if (!this.has(index)) return;
+        this.words[index >>> 5] &= ~(1 << (index & 31));
+        this.size--;
+    }
+    
+    clear() {
+        this.words.fill(0);
+        this.size = 0;
+    }
+    
+    // Serialize as yt-dlp playlist_items ranges, e.g. "1-200,305"
+    toRanges() {
+        const ranges = [];
+        let start = -1;
+        let prev = -1;
+        const limit = this.words.length * 32;
+        for (let index = 0; index <= limit; index++) {
+            const selected = index < limit && this.has(index);
+            if (selected && start < 0) {
+                start = index;
+            } else if (!selected && start >= 0) {
+                ranges.push(start === prev ? `${start}` : `${start}-${prev}`);
+                start = -1;
+            }
+            if (selected) prev = index;
+        }
+        return ranges.join(',');
+    }
+}
+
+let selectedIndices = new SelectionBitset();
+
+// Virtualized playlist list: only rows inside the viewport are in the DOM
+const PLAYLIST_ROW_HEIGHT = 68;
+const PLAYLIST_ROW_STRIDE = PLAYLIST_ROW_HEIGHT + 8;
+const PLAYLIST_VIEWPORT_HEIGHT = 400;
+const PLAYLIST_OVERSCAN = 6;
+let playlistRows = null;
+let renderedRowRange = [-1, -1];
+let playlistScrollPending = false;
 
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
@@ -46,6 +111,10 @@ document.addEventListener('DOMContentLoaded', () => {
     statusCheckInterval = setInterval(checkStatus, 1000);
     
     // Exit button removed - use window close button instead
+    
+    if (new URLSearchParams(window.location.search).get('benchmark') === 'playlist') {
+        runPlaylistBenchmark();
+    }
 });
 
 // Get video info
@@ -115,19 +184,14 @@ downloadBtn.addEventListener('click', async () => {
     }
     
     // Check if playlist and has selections
-    let selectedIndicesArray = null;
+    let selectedRanges = null;
     if (currentPlaylistInfo && currentPlaylistInfo.type === 'playlist') {
-        // Filter to only available videos
-        const availableIndices = Array.from(selectedIndices).filter(idx => {
-            const video = currentPlaylistInfo.videos.find(v => v.index === idx);
-            return video && video.available !== false;
-        });
-        
-        if (availableIndices.length === 0) {
+        // Only available videos can be selected, so the bitset needs no filtering
+        if (selectedIndices.size === 0) {
             showError('Please select at least one available video from the playlist');
             return;
         }
-        selectedIndicesArray = availableIndices.sort((a, b) => a - b);
+        selectedRanges = selectedIndices.toRanges();
     }
     
     downloadCompleted = false;
@@ -151,7 +215,7 @@ downloadBtn.addEventListener('click', async () => {
                 url,
                 bitrate: bitrateSelect.value,
                 output_dir: outputDir.value,
-                selected_indices: selectedIndicesArray
+                selected_indices: selectedRanges
             })
         });
         
@@ -211,7 +275,15 @@ async function checkStatus() {
         } else if (!downloadCompleted && status.status === 'idle' && status.progress === 0) {
             // Download just completed (status reset to idle)
             if (progressContainer && !progressContainer.classList.contains('hidden')) {
-                showSuccess('Download completed successfully!');
+                const failed = status.failed_items || [];
+                if (failed.length > 0) {
+                    const details = failed
+                        .map(item => `${item.title || item.id}: ${item.error_class} (${item.attempts} attempt${item.attempts === 1 ? '' : 's'})`)
+                        .join('\n');
+                    showError(`Download completed, but ${failed.length} item(s) failed:\n${details}`);
+                } else {
+                    showSuccess('Download completed successfully!');
+                }
                 loadFiles();
                 resetDownloadButton();
                 progressContainer.classList.add('hidden');
@@ -240,39 +312,59 @@ async function checkStatus() {
 
 // Update progress display
 function updateProgress(status) {
+    // Overall job progress (the bar no longer resets on every playlist item)
     const percent = Math.round(status.progress || 0);
     progressFill.style.width = `${percent}%`;
     progressPercent.textContent = `${percent}%`;
     
     let statusText = 'Preparing...';
-    if (status.status === 'downloading') {
-        statusText = status.current_item || 'Downloading...';
+    if (status.status === 'downloading' || status.status === 'converting') {
+        statusText = status.status === 'converting' ? 'Converting to MP3' : 'Downloading';
+        if (status.current_item) {
+            statusText += `: ${status.current_item}`;
+        }
         if (status.total_items > 1) {
             statusText += ` (${status.current_item_num || 0}/${status.total_items})`;
         }
-    } else if (status.status === 'converting') {
-        statusText = 'Converting to MP3...';
+    } else if (status.status === 'throttled') {
+        statusText = `Rate limited, pausing for ${status.wait || 0}s`;
+    } else if (status.status === 'retrying') {
+        statusText = `Retrying ${status.retry_items || 0} failed item(s) in ${status.wait || 0}s`;
     } else if (status.status === 'starting') {
         statusText = 'Starting download...';
     }
     
     progressStatus.textContent = statusText;
     
-    // Speed and ETA
-    if (status.speed) {
-        const speedKB = (status.speed / 1024).toFixed(1);
-        const speedMB = (status.speed / 1024 / 1024).toFixed(2);
-        progressSpeed.textContent = speedMB >= 1 
+    // Rolling throughput across the whole job
+    const speed = status.bytes_per_sec || status.speed;
+    let speedText = 'Speed: --';
+    if (speed) {
+        const speedKB = (speed / 1024).toFixed(1);
+        const speedMB = (speed / 1024 / 1024).toFixed(2);
+        speedText = speedMB >= 1 
             ? `Speed: ${speedMB} MB/s`
             : `Speed: ${speedKB} KB/s`;
-    } else {
-        progressSpeed.textContent = 'Speed: --';
     }
+    if (status.total_items > 1) {
+        speedText += ` · ${status.items_done || 0} done`;
+        if (status.items_failed) {
+            speedText += `, ${status.items_failed} failed`;
+        }
+        if (status.items_per_min) {
+            speedText += ` · ${status.items_per_min.toFixed(1)} items/min`;
+        }
+    }
+    progressSpeed.textContent = speedText;
     
     if (status.eta) {
-        const minutes = Math.floor(status.eta / 60);
-        const seconds = status.eta % 60;
-        progressETA.textContent = `ETA: ${minutes}:${seconds.toString().padStart(2, '0')}`;
+        const eta = Math.round(status.eta);
+        const hours = Math.floor(eta / 3600);
+        const minutes = Math.floor((eta % 3600) / 60);
+        const seconds = eta % 60;
+        progressETA.textContent = hours > 0
+            ? `ETA: ${hours}:${minutes.toString().padStart(2, '0')}:${seconds.toString().padStart(2, '0')}`
+            : `ETA: ${minutes}:${seconds.toString().padStart(2, '0')}`;
     } else {
         progressETA.textContent = 'ETA: --:--';
     }
@@ -317,19 +409,52 @@ function displayPlaylistSelection(info) {
     playlistSelection.classList.remove('hidden');
     
     // Select only available videos by default
-    selectedIndices.clear();
+    selectedIndices = new SelectionBitset(info.videos.length);
     info.videos.forEach(video => {
         if (video.available !== false && video.index > 0) {
             selectedIndices.add(video.index);
         }
     });
     
-    playlistItems.innerHTML = info.videos.map(video => {
-        const isAvailable = video.available !== false && video.index > 0;
-        const displayIndex = video.index > 0 ? video.index : video.original_index;
-        const isSelected = isAvailable && selectedIndices.has(video.index);
-        return `
+    // A spacer sized for every row keeps the scrollbar honest; rows are
+    // rendered into it on demand by renderPlaylistRows()
+    playlistItems.classList.add('virtualized');
+    playlistItems.style.height = `${Math.min(PLAYLIST_VIEWPORT_HEIGHT, info.videos.length * PLAYLIST_ROW_STRIDE)}px`;
+    playlistItems.innerHTML = `<div class="playlist-items-spacer" style="height: ${info.videos.length * PLAYLIST_ROW_STRIDE - 8}px"></div>`;
+    playlistRows = playlistItems.firstElementChild;
+    playlistItems.scrollTop = 0;
+    renderedRowRange = [-1, -1];
+    renderPlaylistRows();
+    
+    updateSelectedCount();
+}
+
+// Render the rows currently inside (or just outside) the viewport
+function renderPlaylistRows(force = false) {
+    if (!currentPlaylistInfo || !playlistRows) return;
+    const videos = currentPlaylistInfo.videos;
+    const scrollTop = playlistItems.scrollTop;
+    const viewport = playlistItems.clientHeight || PLAYLIST_VIEWPORT_HEIGHT;
+    const first = Math.max(0, Math.floor(scrollTop / PLAYLIST_ROW_STRIDE) - PLAYLIST_OVERSCAN);
+    const last = Math.min(videos.length, Math.ceil((scrollTop + viewport) / PLAYLIST_ROW_STRIDE) + PLAYLIST_OVERSCAN);
+    
+    if (!force && first === renderedRowRange[0] && last === renderedRowRange[1]) return;
+    renderedRowRange = [first, last];
+    
+    let html = '';
+    for (let pos = first; pos < last; pos++) {
+        html += renderPlaylistRow(videos[pos], pos);
+    }
+    playlistRows.innerHTML = html;
+}
+
+function renderPlaylistRow(video, pos) {
+    const isAvailable = video.available !== false && video.index > 0;
+    const isSelected = isAvailable && selectedIndices.has(video.index);
+    return `
         <div class="playlist-item ${isSelected ? 'selected' : ''} ${!isAvailable ? 'unavailable' : ''}" 
+             style="top: ${pos * PLAYLIST_ROW_STRIDE}px"
+             data-pos="${pos}"
              data-index="${video.index > 0 ? video.index : -1}" 
              data-available="${isAvailable}">
             <input 
@@ -351,43 +476,42 @@ function displayPlaylistSelection(info) {
             </div>
         </div>
     `;
-    }).join('');
-    
-    updateSelectedCount();
-    
-    // Add event listeners only for available videos
-    playlistItems.querySelectorAll('.playlist-item-checkbox:not(:disabled)').forEach(checkbox => {
-        checkbox.addEventListener('change', (e) => {
-            const index = parseInt(e.target.dataset.index);
-            if (index > 0) {  // Only process available videos (positive index)
-                if (e.target.checked) {
-                    selectedIndices.add(index);
-                } else {
-                    selectedIndices.delete(index);
-                }
-                updatePlaylistItemState(index, e.target.checked);
-                updateSelectedCount();
-            }
-        });
+}
+
+// Re-render on scroll, at most once per frame
+playlistItems.addEventListener('scroll', () => {
+    if (playlistScrollPending) return;
+    playlistScrollPending = true;
+    requestAnimationFrame(() => {
+        playlistScrollPending = false;
+        renderPlaylistRows();
     });
+});
+
+// One delegated handler for every row, rendered or not yet rendered
+playlistItems.addEventListener('click', (e) => {
+    const item = e.target.closest('.playlist-item');
+    if (!item || item.dataset.available !== 'true' || e.target.closest('.unavailable-badge')) return;
     
-    // Add click handler to entire item (only for available videos)
-    playlistItems.querySelectorAll('.playlist-item[data-available="true"]').forEach(item => {
-        item.addEventListener('click', (e) => {
-            if (e.target.type !== 'checkbox' && !e.target.closest('.unavailable-badge')) {
-                const checkbox = item.querySelector('.playlist-item-checkbox');
-                if (!checkbox.disabled) {
-                    checkbox.checked = !checkbox.checked;
-                    checkbox.dispatchEvent(new Event('change'));
-                }
-            }
-        });
-    });
-}
+    const index = parseInt(item.dataset.index);
+    if (index <= 0) return;
+    
+    // A click on the checkbox has already toggled it; a click elsewhere on the row has not
+    const checkbox = item.querySelector('.playlist-item-checkbox');
+    const selected = e.target === checkbox ? checkbox.checked : !selectedIndices.has(index);
+    if (selected) {
+        selectedIndices.add(index);
+    } else {
+        selectedIndices.delete(index);
+    }
+    checkbox.checked = selected;
+    updatePlaylistItemState(index, selected);
+    updateSelectedCount();
+});
 
 // Update playlist item visual state
 function updatePlaylistItemState(index, selected) {
-    const item = playlistItems.querySelector(`[data-index="${index}"]`);
+    const item = playlistRows && playlistRows.querySelector(`.playlist-item[data-index="${index}"]`);
     if (item) {
         if (selected) {
             item.classList.add('selected');
@@ -409,29 +533,91 @@ selectAllBtn.addEventListener('click', () => {
     
     currentPlaylistInfo.videos.forEach(video => {
         // Only select available videos
-        if (video.available !== false) {
+        if (video.available !== false && video.index > 0) {
             selectedIndices.add(video.index);
-            const checkbox = playlistItems.querySelector(`[data-index="${video.index}"]`);
-            if (checkbox && !checkbox.disabled) {
-                checkbox.checked = true;
-                updatePlaylistItemState(video.index, true);
-            }
         }
     });
+    renderPlaylistRows(true);
     updateSelectedCount();
 });
 
 // Deselect all
 deselectAllBtn.addEventListener('click', () => {
     selectedIndices.clear();
-    playlistItems.querySelectorAll('.playlist-item-checkbox').forEach(checkbox => {
-        checkbox.checked = false;
-        const index = parseInt(checkbox.dataset.index);
-        updatePlaylistItemState(index, false);
-    });
+    renderPlaylistRows(true);
     updateSelectedCount();
 });
 
+// In-page benchmark for the playlist list: open the page with ?benchmark=playlist
+// or call runPlaylistBenchmark() from the console
+async function runPlaylistBenchmark(entries = 10000, clicks = 200) {
+    const nextFrame = () => new Promise(resolve => requestAnimationFrame(() => resolve()));
+    const videos = [];
+    for (let i = 1; i <= entries; i++) {
+        const available = i % 97 !== 0;
+        videos.push({
+            index: -1,
+            original_index: i,
+            title: `Benchmark entry ${i}`,
+            duration: 60 + (i % 600),
+            available
+        });
+    }
+    // Available entries are numbered consecutively, as get_video_info() does
+    let availableIndex = 1;
+    videos.forEach(video => {
+        video.index = video.available ? availableIndex++ : -1;
+    });
+    
+    const info = {
+        type: 'playlist',
+        title: `Benchmark playlist (${entries} entries)`,
+        count: availableIndex - 1,
+        unavailable_count: entries - (availableIndex - 1),
+        videos
+    };
+    
+    const renderStart = performance.now();
+    displayVideoInfo(info);
+    const renderScript = performance.now() - renderStart;
+    await nextFrame();
+    const renderTotal = performance.now() - renderStart;
+    
+    // Click latency: toggle rows spread over the whole list
+    const latencies = [];
+    for (let i = 0; i < clicks; i++) {
+        playlistItems.scrollTop = Math.floor((i / clicks) * playlistItems.scrollHeight);
+        renderPlaylistRows();
+        const row = playlistRows.querySelector('.playlist-item[data-available="true"]');
+        if (!row) continue;
+        const clickStart = performance.now();
+        row.querySelector('.playlist-item-info').click();
+        latencies.push(performance.now() - clickStart);
+    }
+    latencies.sort((a, b) => a - b);
+    
+    const rangesStart = performance.now();
+    const ranges = selectedIndices.toRanges();
+    const rangesTime = performance.now() - rangesStart;
+    
+    const results = {
+        entries,
+        rendered_rows: playlistRows.children.length,
+        render_script_ms: +renderScript.toFixed(2),
+        render_to_frame_ms: +renderTotal.toFixed(2),
+        click_median_ms: +(latencies[Math.floor(latencies.length / 2)] || 0).toFixed(3),
+        click_p95_ms: +(latencies[Math.floor(latencies.length * 0.95)] || 0).toFixed(3),
+        click_max_ms: +(latencies[latencies.length - 1] || 0).toFixed(3),
+        to_ranges_ms: +rangesTime.toFixed(3),
+        ranges_length: ranges.length
+    };
+    console.table(results);
+    showSuccess(`Playlist benchmark (${entries} entries): render ${results.render_to_frame_ms} ms, ` +
+        `click median ${results.click_median_ms} ms / p95 ${results.click_p95_ms} ms`);
+    return results;
+}
+window.runPlaylistBenchmark = runPlaylistBenchmark;
+
 // Load files list
 async function loadFiles() {
     try {
@@ -477,7 +663,27 @@ function displayFiles(files) {
         return;
     }
     
-    filesList.innerHTML = files.map(file => `
+    // Offer a ZIP export for every playlist folder
+    const folders = [...new Set(files
+        .map(file => file.path.split(/[\\/]/))
+        .filter(parts => parts.length > 1)
+        .map(parts => parts[0]))].sort();
+    const dir = outputDir.value || 'downloads';
+    const folderExports = folders.map(folder => `
+        <div class="file-item folder-item">
+            <div class="file-info">
+                <div class="file-name">📁 ${escapeHtml(folder)}</div>
+                <div class="file-path">${files.filter(file => file.path.split(/[\\/]/)[0] === folder).length} file(s)</div>
+            </div>
+            <div class="file-actions">
+                <button class="file-download-btn" onclick="exportFolder('${escapeJsString(folder)}', '${escapeJsString(dir)}')">
+                    Export ZIP
+                </button>
+            </div>
+        </div>
+    `).join('');
+    
+    filesList.innerHTML = folderExports + files.map(file => `
         <div class="file-item">
             <div class="file-info">
                 <div class="file-name">${escapeHtml(file.name)}</div>
@@ -497,6 +703,11 @@ function downloadFile(path, dir) {
     window.open(`${API_BASE}/api/download-file?path=${encodeURIComponent(path)}&dir=${encodeURIComponent(dir)}`, '_blank');
 }
 
+// Export a whole playlist folder as a streamed ZIP archive
+function exportFolder(folder, dir) {
+    window.open(`${API_BASE}/api/export?folder=${encodeURIComponent(folder)}&dir=${encodeURIComponent(dir)}`, '_blank');
+}
+
 // Utility functions
 function showError(message) {
     errorMessage.textContent = message;
@@ -551,6 +762,11 @@ function escapeHtml(text) {
     return div.innerHTML;
 }
 
+// Escape text for a single-quoted JS string inside an HTML attribute
+function escapeJsString(text) {
+    return escapeHtml(String(text).replace(/\\/g, '\\\\').replace(/'/g, "\\'"));
+}
+
 // Allow Enter key to trigger download
 urlInput.addEventListener('keypress', (e) => {
     if (e.key === 'Enter') {
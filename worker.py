@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Headless Download Worker for YouTube to MP3 Downloader
+Leases playlist items from a shared job store and downloads them
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+from threading import Event, Thread
+from job_store import open_job_store, StoreCircuitBreaker
+from youtube_downloader import (
+    YouTubeDownloader, RETRYABLE_ERRORS, classify_error, list_playlist_entries, select_playlist_entries
+)
+
+
+class Worker:
+    """Drain items from a job store until stopped"""
+    
+    def __init__(self, store, worker_id=None, lease_seconds=120, poll_interval=5,
+                 output_dir=None, staging_dir=None, normalize=False):
+        """
+        Initialize the worker
+        
+        Args:
+            store: JobStore to take work from
+            worker_id: Unique name for this worker (default: hostname-pid)
+            lease_seconds: How long a lease lasts without a heartbeat
+            poll_interval: Seconds to wait when the queue is empty
+            output_dir: Overrides the output directory stored with each job
+            staging_dir: Local scratch directory for jobs that do not set their own
+            normalize: Apply loudness normalization to every downloaded file, not
+                just to jobs that ask for it
+        """
+        self.store = store
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.output_dir = output_dir
+        self.staging_dir = staging_dir
+        self.normalize = normalize
+        self.stop_event = Event()
+        self.downloaders = {}
+        self.circuit_breakers = {}
+    
+    def get_circuit_breaker(self, name):
+        """Return the circuit breaker for an extractor, shared with every worker through the store"""
+        name = (name or 'generic').lower()
+        if name not in self.circuit_breakers:
+            self.circuit_breakers[name] = StoreCircuitBreaker(self.store, name)
+        return self.circuit_breakers[name]
+    
+    def get_downloader(self, item):
+        """Reuse one downloader per combination of job settings"""
+        output_dir = self.output_dir or item['output_dir']
+        staging_dir = item['staging_dir'] or self.staging_dir
+        normalize = self.normalize or bool(item['normalize'])
+        key = (output_dir, item['bitrate'], staging_dir, normalize)
+        if key not in self.downloaders:
+            # One attempt per lease: the store owns retries and their backoff
+            self.downloaders[key] = YouTubeDownloader(
+                output_dir=output_dir,
+                bitrate=item['bitrate'],
+                max_attempts=1,
+                staging_dir=staging_dir,
+                normalize=normalize,
+                circuit_breakers=self.get_circuit_breaker
+            )
+        return self.downloaders[key]
+    
+    def keep_lease(self, item_id, done):
+        """Heartbeat a lease until the item is finished"""
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                if not self.store.heartbeat(item_id, self.worker_id, self.lease_seconds):
+                    print(f"[{self.worker_id}] Lost lease on item {item_id}")
+                    return
+            except Exception as e:
+                print(f"[{self.worker_id}] Heartbeat failed for item {item_id}: {e}")
+    
+    def process(self, item):
+        """Run one leased item"""
+        if item['kind'] == 'expand':
+            title, entries = list_playlist_entries(item['url'])
+            selected = select_playlist_entries(entries, item['playlist_items'])
+            expanded = self.store.expand_item(
+                item['id'],
+                self.worker_id,
+                [(index, entry['id'], entry['url']) for index, entry in selected],
+                title=title,
+                playlist_count=len(entries)
+            )
+            if not expanded:
+                print(f"[{self.worker_id}] Job {item['job_id']}: lost the lease before queueing '{title}'")
+                return
+            print(f"[{self.worker_id}] Job {item['job_id']}: queued {len(selected)} item(s) from '{title}'")
+            return
+        
+        downloader = self.get_downloader(item)
+        profile = bool(item['profile'])
+        if item['video_url']:
+            # Download the entry itself, laid out as part of its playlist
+            result = downloader.download(item['video_url'], profile=profile, playlist_entry={
+                'title': item['title'],
+                'index': item['playlist_index'],
+                'count': item['playlist_count'],
+            })
+        else:
+            result = downloader.download(item['url'], profile=profile)
+        if result['failed']:
+            failure = result['failed'][0]
+            self.store.fail_item(
+                item['id'], self.worker_id, failure['error'], failure['error_class'],
+                retryable=failure['error_class'] in RETRYABLE_ERRORS
+            )
+        else:
+            title = downloader.job_progress.current.title if downloader.job_progress.current else None
+            self.store.complete_item(item['id'], self.worker_id, title=title)
+    
+    def run_once(self):
+        """
+        Lease and process a single item
+        
+        Returns:
+            False if there was nothing to do
+        """
+        item = self.store.lease_item(self.worker_id, self.lease_seconds)
+        if item is None:
+            return False
+        
+        label = f"job {item['job_id']} item {item['playlist_index'] or item['kind']}"
+        print(f"[{self.worker_id}] Leased {label} (lease {item['leases']})")
+        started = time.perf_counter()
+        done = Event()
+        heartbeat = Thread(target=self.keep_lease, args=(item['id'], done), daemon=True)
+        heartbeat.start()
+        try:
+            self.process(item)
+        except Exception as e:
+            error = str(e)
+            error_class = classify_error(error)
+            self.store.fail_item(item['id'], self.worker_id, error, error_class,
+                                 retryable=error_class in RETRYABLE_ERRORS)
+            print(f"[{self.worker_id}] Failed {label}: {error}")
+        finally:
+            done.set()
+            heartbeat.join()
+        print(f"[{self.worker_id}] Finished {label} in {time.perf_counter() - started:.1f}s")
+        return True
+    
+    def run(self, exit_when_empty=False):
+        """Process items until stop() is called (or the queue is drained)"""
+        while not self.stop_event.is_set():
+            if self.run_once():
+                continue
+            if exit_when_empty and not self.store.has_pending():
+                break
+            self.stop_event.wait(self.poll_interval)
+    
+    def stop(self):
+        self.stop_event.set()
+
+
+def main():
+    """CLI entry point for a headless worker"""
+    parser = argparse.ArgumentParser(
+        description='Headless worker that downloads queued items from a shared job store',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Run a worker against a store on a shared volume
+  python worker.py --store "\\\\server\\share\\jobs.db"
+  
+  # Start the web UI in enqueue-only mode against the same store
+  set YTDL_JOB_STORE=\\\\server\\share\\jobs.db
+  python app.py
+        """
+    )
+    
+    parser.add_argument(
+        '--store',
+        default=os.environ.get('YTDL_JOB_STORE'),
+        help='Job store location: a SQLite file path or backend URL (default: $YTDL_JOB_STORE)'
+    )
+    
+    parser.add_argument(
+        '--worker-id',
+        default=None,
+        help='Unique worker name (default: hostname-pid)'
+    )
+    
+    parser.add_argument(
+        '--lease',
+        type=float,
+        default=120,
+        help='Lease length in seconds; leases are renewed every third of it (default: 120)'
+    )
+    
+    parser.add_argument(
+        '--poll',
+        type=float,
+        default=5,
+        help='Seconds to wait between checks when the queue is empty (default: 5)'
+    )
+    
+    parser.add_argument(
+        '--output', '-o',
+        default=None,
+        help='Output directory, overriding the one stored with each job'
+    )
+    
+    parser.add_argument(
+        '--staging-dir', '-s',
+        default=None,
+        help='Local scratch directory for downloading and converting, for jobs that do not set their own'
+    )
+    
+    parser.add_argument(
+        '--normalize', '-n',
+        action='store_true',
+        help='Normalize loudness (two-pass EBU R128) of every downloaded file, not just jobs that ask for it'
+    )
+    
+    parser.add_argument(
+        '--exit-when-empty',
+        action='store_true',
+        help='Exit once no items are queued or leased'
+    )
+    
+    args = parser.parse_args()
+    
+    if not args.store:
+        print("Error: No job store given. Use --store or set YTDL_JOB_STORE.")
+        sys.exit(1)
+    
+    worker = Worker(
+        open_job_store(args.store),
+        worker_id=args.worker_id,
+        lease_seconds=args.lease,
+        poll_interval=args.poll,
+        output_dir=args.output,
+        staging_dir=args.staging_dir,
+        normalize=args.normalize
+    )
+    print(f"Worker {worker.worker_id} taking jobs from {args.store}. Press Ctrl+C to stop.")
+    try:
+        worker.run(exit_when_empty=args.exit_when_empty)
+    except KeyboardInterrupt:
+        worker.stop()
+        print("\nWorker stopped.")
+
+
+if __name__ == '__main__':
+    main()
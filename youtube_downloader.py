@@ -7,10 +7,24 @@ Downloads YouTube videos or entire playlists and converts them to MP3 at 172kbps
 import os
 import sys
 import json
+import time
+import random
+import uuid
 import shutil
+import sqlite3
+import pstats
+import subprocess
+import cProfile
+from datetime import datetime
 from pathlib import Path
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse, parse_qs
 import yt_dlp
-from threading import Lock
+from yt_dlp.postprocessor import PostProcessor, FFmpegPostProcessor
+from yt_dlp.postprocessor.ffmpeg import ACODECS
+from threading import Lock, RLock, Event, Condition, Thread, get_ident, local as threading_local
 
 # Global lock for thread-safe operations
 download_lock = Lock()
@@ -89,8 +103,915 @@ def get_default_downloads_dir():
     return downloads_dir
 
 
+# Highest playlist index accepted in a selection; larger ranges are clamped to it
+MAX_PLAYLIST_INDEX = 100000
+
+
+def parse_playlist_items(spec, max_index=MAX_PLAYLIST_INDEX):
+    """
+    Validate a playlist selection and merge it into compact ranges
+    
+    Ranges are never expanded, so "1-2000000000" costs no more than "1-5".
+    
+    Args:
+        spec: List of indices, or a ranges string such as "1-200,305"
+        max_index: Highest index to accept, e.g. the playlist size when known;
+            ranges running past it are clamped
+    
+    Returns:
+        Sorted list of non-overlapping (start, end) tuples, 1-based and inclusive
+    """
+    if isinstance(spec, (list, tuple, set)):
+        ranges = [(int(i), int(i)) for i in spec]
+    else:
+        ranges = []
+        for part in str(spec).split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if '-' in part:
+                start, end = part.split('-', 1)
+                start, end = int(start), int(end)
+                if start > end:
+                    raise ValueError(f"Invalid playlist range: {part}")
+            else:
+                start = end = int(part)
+            ranges.append((start, end))
+    
+    merged = []
+    for start, end in sorted(ranges):
+        if start < 1:
+            raise ValueError("Playlist indices start at 1")
+        if start > max_index:
+            raise ValueError(f"Playlist index {start} is out of range (maximum {max_index})")
+        end = min(end, max_index)
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def format_playlist_items(ranges):
+    """Format (start, end) ranges as a yt-dlp playlist_items string such as 1-200,305"""
+    return ','.join(f"{start}-{end}" if start != end else f"{start}" for start, end in ranges)
+
+
+def count_playlist_items(ranges):
+    """Number of playlist entries covered by (start, end) ranges"""
+    return sum(end - start + 1 for start, end in ranges)
+
+
+def is_playlist_url(url):
+    """Whether a URL points at a playlist rather than a single video"""
+    return 'playlist' in url.lower() or 'list=' in url.lower()
+
+
+def get_url_key(url):
+    """
+    Identify the video or playlist a URL points to without any network access
+    
+    URLs carrying a list= parameter are keyed by the playlist, since
+    is_playlist_url() makes them download as one (e.g. watch?v=...&list=...).
+    
+    Returns:
+        'video:<id>' or 'playlist:<id>' for recognised YouTube URLs, otherwise the stripped URL
+    """
+    url = url.strip()
+    parsed = urlparse(url if '://' in url else f'https://{url}')
+    host = (parsed.hostname or '').lower()
+    query = parse_qs(parsed.query)
+    
+    if host == 'youtu.be' or host.endswith('.youtu.be'):
+        if query.get('list'):
+            return f"playlist:{query['list'][0]}"
+        video_id = parsed.path.strip('/').split('/')[0]
+        if video_id:
+            return f'video:{video_id}'
+    elif host == 'youtube.com' or host.endswith('.youtube.com'):
+        if query.get('list'):
+            return f"playlist:{query['list'][0]}"
+        if query.get('v'):
+            return f"video:{query['v'][0]}"
+        parts = parsed.path.strip('/').split('/')
+        if len(parts) >= 2 and parts[0] in ('shorts', 'embed', 'live', 'v') and parts[1]:
+            return f'video:{parts[1]}'
+    return url
+
+
+# Error classes that are worth another attempt; 'unavailable' and unrecognised errors never are
+RETRYABLE_ERRORS = {'throttled', 'forbidden', 'network'}
+
+
+def classify_error(message):
+    """
+    Sort a yt-dlp error message into a coarse error class
+    
+    Returns:
+        One of 'throttled', 'forbidden', 'network', 'unavailable', 'postprocessing' or 'other'
+    """
+    msg = message.lower()
+    if any(word in msg for word in ('429', 'too many requests', 'rate limit', 'rate-limit',
+                                    'try again later', 'not a bot')):
+        return 'throttled'
+    if '403' in msg or 'forbidden' in msg:
+        return 'forbidden'
+    if any(word in msg for word in ('unavailable', 'private video', 'removed', 'copyright', 'blocked', 'not available',
+                                    'sign in', 'confirm your age', 'age-restricted', 'inappropriate',
+                                    'members-only', 'members only', "channel's members", 'join this channel')):
+        return 'unavailable'
+    if any(word in msg for word in ('timed out', 'timeout', 'connection', 'network', 'temporary failure',
+                                    'reset by peer', 'incomplete read', 'unable to download')):
+        return 'network'
+    if 'ffmpeg' in msg or 'postprocess' in msg:
+        return 'postprocessing'
+    return 'other'
+
+
+class CircuitBreaker:
+    """
+    Shared back-off for one extractor/host.
+    
+    Every downloader consults the same breaker before starting an item, so
+    when one worker gets throttled all of them pause together instead of
+    each retrying against the server on its own.
+    """
+    
+    def __init__(self, name, base_cooldown=30, max_cooldown=600):
+        self.name = name
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.lock = Lock()
+        self.strikes = 0
+        self.open_until = 0
+    
+    def record_throttle(self):
+        """
+        Open the breaker for an exponentially growing, jittered cooldown
+        
+        Returns:
+            The cooldown in seconds
+        """
+        with self.lock:
+            self.strikes += 1
+            cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (self.strikes - 1))
+            cooldown = cooldown / 2 + random.uniform(0, cooldown / 2)
+            self.open_until = max(self.open_until, time.monotonic() + cooldown)
+        return cooldown
+    
+    def record_success(self):
+        """Let the cooldown shrink again after a successful item"""
+        with self.lock:
+            self.strikes = max(0, self.strikes - 1)
+    
+    def wait(self):
+        """Block until the breaker is closed"""
+        while True:
+            with self.lock:
+                remaining = self.open_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, 5))
+
+
+# One breaker per extractor, shared by every downloader in the process
+circuit_breakers = {}
+
+
+def get_circuit_breaker(name):
+    """Return the shared circuit breaker for an extractor/host"""
+    name = (name or 'generic').lower()
+    with download_lock:
+        if name not in circuit_breakers:
+            circuit_breakers[name] = CircuitBreaker(name)
+        return circuit_breakers[name]
+
+
+class StagingArea:
+    """
+    Local scratch directory where downloads and conversions happen.
+    
+    Jobs are admitted only while the disk keeps enough free space for every
+    admitted job's reservation plus a safety margin, and only up to
+    max_jobs at a time; later jobs wait until earlier ones finish.
+    """
+    
+    def __init__(self, path, reserve_bytes=512 * 1024 * 1024, min_free_bytes=1024 * 1024 * 1024, max_jobs=4):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.reserve_bytes = reserve_bytes
+        self.min_free_bytes = min_free_bytes
+        self.max_jobs = max_jobs
+        self.condition = Condition()
+        self.active_jobs = 0
+        self.reserved = 0
+    
+    def free_bytes(self):
+        """Free space on the staging disk"""
+        return shutil.disk_usage(self.path).free
+    
+    def has_room(self):
+        """Whether one more job fits next to the ones already admitted"""
+        if self.active_jobs >= self.max_jobs:
+            return False
+        return self.free_bytes() - self.reserved >= self.reserve_bytes + self.min_free_bytes
+    
+    @contextmanager
+    def admit(self):
+        """
+        Wait for room, then yield a private directory for one job
+        
+        The directory and anything left in it are removed when the job ends.
+        """
+        with self.condition:
+            if self.active_jobs == 0 and not self.has_room():
+                # Nothing to wait for: the disk is simply too full
+                raise Exception(
+                    f"Not enough free space in staging directory '{self.path}' "
+                    f"({self.free_bytes() // (1024 * 1024)} MB free)"
+                )
+            while not self.has_room():
+                self.condition.wait(timeout=5)
+            self.active_jobs += 1
+            self.reserved += self.reserve_bytes
+        
+        job_dir = self.path / f"job-{uuid.uuid4().hex}"
+        job_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            yield job_dir
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            with self.condition:
+                self.active_jobs -= 1
+                self.reserved -= self.reserve_bytes
+                self.condition.notify_all()
+
+
+# One staging area per directory, shared by every downloader in the process
+staging_areas = {}
+
+
+def get_staging_area(path):
+    """Return the shared staging area for a directory"""
+    key = os.path.abspath(path)
+    with download_lock:
+        if key not in staging_areas:
+            staging_areas[key] = StagingArea(key)
+        return staging_areas[key]
+
+
+# Process-wide pool for CPU-bound FFmpeg work, created on first use
+cpu_pool = None
+
+
+def get_cpu_pool():
+    """Return the shared pool sized to the number of CPUs"""
+    global cpu_pool
+    with download_lock:
+        if cpu_pool is None:
+            cpu_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix='ffmpeg')
+        return cpu_pool
+
+
+def publish_file(src, dest):
+    """
+    Move a finished file into place so it appears atomically at dest
+    
+    A rename is used when source and destination share a filesystem;
+    otherwise the file is copied next to dest under a temporary name
+    and renamed over it once complete.
+    """
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.replace(src, dest)
+        return
+    except OSError:
+        pass  # Different filesystem
+    
+    tmp_dest = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.publishing")
+    try:
+        shutil.copyfile(src, tmp_dest)
+        os.replace(tmp_dest, dest)
+    except BaseException:
+        try:
+            os.remove(tmp_dest)
+        except OSError:
+            pass
+        raise
+    os.remove(src)
+
+
+class TrackedYoutubeDL(yt_dlp.YoutubeDL):
+    """YoutubeDL that reports errors swallowed by 'ignoreerrors' to a callback"""
+    
+    def __init__(self, params=None, on_error=None, **kwargs):
+        super().__init__(params, **kwargs)
+        self.on_error = on_error
+    
+    def report_error(self, message, *args, **kwargs):
+        if self.on_error:
+            self.on_error(message)
+        return super().report_error(message, *args, **kwargs)
+
+
+class PlaylistEntryPP(PostProcessor):
+    """
+    Give a video downloaded on its own the fields of the playlist it belongs to.
+    
+    Runs before the filename is chosen, so the playlist output template puts
+    it in the playlist's folder with the same zero-padded track number as a
+    whole-playlist download would.
+    """
+    
+    def __init__(self, downloader=None, playlist_title='', playlist_index=None, playlist_count=None):
+        PostProcessor.__init__(self, downloader)
+        self.playlist_title = playlist_title
+        self.playlist_index = playlist_index
+        self.playlist_count = playlist_count
+    
+    def run(self, information):
+        information['playlist_title'] = self.playlist_title
+        information['playlist_index'] = self.playlist_index
+        # yt-dlp pads playlist_index to the width of the last index
+        information['__last_playlist_index'] = self.playlist_count or self.playlist_index
+        return [], information
+
+
+class ItemProgress:
+    """Compact progress record for one playlist entry"""
+    __slots__ = ('title', 'state', 'downloaded', 'total', 'download_finished_at')
+    
+    def __init__(self, title=''):
+        self.title = title
+        self.state = 'queued'
+        self.downloaded = 0
+        self.total = 0
+        self.download_finished_at = None
+
+
+class JobProgress:
+    """
+    Progress of a whole download job.
+    
+    Keeps one ItemProgress per entry, a rolling window of byte and item
+    completion samples for throughput, and the average transcode time so
+    the job ETA covers both the remaining downloads and their conversion.
+    Items may be finished from CPU pool threads, so updates hold a lock.
+    """
+    
+    # One character per item in snapshot()['item_states']
+    STATE_CODES = {'queued': 'q', 'downloading': 'd', 'converting': 'c', 'done': 'D', 'failed': 'F'}
+    
+    def __init__(self, total_items=0, window=30, item_window=300):
+        self.total_items = total_items
+        self.window = window
+        self.item_window = item_window
+        self.started_at = time.monotonic()
+        self.items = {}
+        self.current_id = None
+        self.counts = {state: 0 for state in self.STATE_CODES}
+        self.bytes_done = 0
+        self.byte_samples = deque()
+        self.completed_at = deque()
+        self.downloaded_bytes_total = 0
+        self.downloaded_items = 0
+        self.transcode_seconds = 0.0
+        self.transcoded_items = 0
+        self.lock = RLock()
+    
+    def set_state(self, item, state):
+        self.counts[item.state] -= 1
+        self.counts[state] += 1
+        item.state = state
+    
+    def start_item(self, item_id, title='', total_items=None):
+        """Mark an item as in flight (called again on retries)"""
+        with self.lock:
+            if total_items and total_items > self.total_items:
+                self.total_items = total_items
+            item = self.items.get(item_id)
+            if item is None:
+                item = self.items[item_id] = ItemProgress(title)
+                self.counts['queued'] += 1
+            if title:
+                item.title = title
+            if item.state in ('queued', 'failed'):
+                item.downloaded = 0
+                self.set_state(item, 'downloading')
+            self.current_id = item_id
+    
+    @property
+    def current(self):
+        return self.items.get(self.current_id)
+    
+    def update_download(self, downloaded, total):
+        """Record bytes downloaded for the current item"""
+        with self.lock:
+            item = self.current
+            if item is None:
+                return
+            if downloaded > item.downloaded:
+                self.bytes_done += downloaded - item.downloaded
+            item.downloaded = downloaded
+            item.total = total or item.total
+            now = time.monotonic()
+            self.byte_samples.append((now, self.bytes_done))
+            while self.byte_samples and now - self.byte_samples[0][0] > self.window:
+                self.byte_samples.popleft()
+    
+    def finish_download(self):
+        """The current item is downloaded and now being converted"""
+        with self.lock:
+            item = self.current
+            if item is None or item.state != 'downloading':
+                return
+            self.downloaded_bytes_total += item.total or item.downloaded
+            self.downloaded_items += 1
+            item.download_finished_at = time.monotonic()
+            self.set_state(item, 'converting')
+    
+    def finish_item(self, item_id=None):
+        """An item (the current one by default) has been downloaded and converted"""
+        with self.lock:
+            item = self.current if item_id is None else self.items.get(item_id)
+            if item is None or item.state in ('done', 'failed'):
+                return
+            now = time.monotonic()
+            if item.download_finished_at is not None:
+                self.transcode_seconds += now - item.download_finished_at
+                self.transcoded_items += 1
+            self.set_state(item, 'done')
+            self.completed_at.append(now)
+            while self.completed_at and now - self.completed_at[0] > self.item_window:
+                self.completed_at.popleft()
+    
+    def fail_item(self, item_id):
+        """Mark an item as failed (it may still be retried)"""
+        with self.lock:
+            item = self.items.get(item_id)
+            if item is not None and item.state != 'failed':
+                self.set_state(item, 'failed')
+    
+    def bytes_per_sec(self):
+        """Download throughput over the rolling window"""
+        if len(self.byte_samples) < 2:
+            return 0
+        (t0, b0), (t1, b1) = self.byte_samples[0], self.byte_samples[-1]
+        return (b1 - b0) / (t1 - t0) if t1 > t0 else 0
+    
+    def items_per_min(self):
+        """Completed items per minute over the rolling window (job average as fallback)"""
+        now = time.monotonic()
+        if len(self.completed_at) >= 2 and now > self.completed_at[0]:
+            return (len(self.completed_at) - 1) * 60 / (now - self.completed_at[0])
+        elapsed = now - self.started_at
+        return self.counts['done'] * 60 / elapsed if elapsed > 0 else 0
+    
+    def eta(self):
+        """Seconds until the job is done, including conversion, or None if unknown"""
+        done = self.counts['done'] + self.counts['failed']
+        remaining_items = max(0, self.total_items - done)
+        if remaining_items == 0:
+            return 0
+        
+        bps = self.bytes_per_sec()
+        if bps > 0 and self.downloaded_items:
+            avg_item_bytes = self.downloaded_bytes_total / self.downloaded_items
+            current = self.current
+            remaining_bytes = 0
+            not_started = remaining_items - self.counts['downloading'] - self.counts['converting']
+            if current is not None and current.state == 'downloading':
+                remaining_bytes += max(0, (current.total or avg_item_bytes) - current.downloaded)
+            remaining_bytes += max(0, not_started) * avg_item_bytes
+            avg_transcode = self.transcode_seconds / self.transcoded_items if self.transcoded_items else 0
+            return remaining_bytes / bps + remaining_items * avg_transcode
+        
+        rate = self.items_per_min()
+        if rate > 0:
+            return remaining_items / rate * 60
+        return None
+    
+    def percent(self):
+        """Overall job progress, counting the current item's download fraction"""
+        if not self.total_items:
+            return 0
+        finished = self.counts['done'] + self.counts['failed']
+        # Downloaded items may still be converting while the next one downloads
+        finished += self.counts['converting'] * 0.9
+        current = self.current
+        if current is not None and current.state == 'downloading' and current.total:
+            finished += min(1, current.downloaded / current.total) * 0.9
+        return min(100, finished * 100 / self.total_items)
+    
+    def snapshot(self):
+        """Return a JSON-friendly summary of the job"""
+        with self.lock:
+            states = ''.join(self.STATE_CODES[item.state] for item in self.items.values())
+            states += 'q' * max(0, self.total_items - len(states))
+            current = self.current
+            eta = self.eta()
+            return {
+                'percent': self.percent(),
+                'total_items': self.total_items,
+                'current_item_num': len(self.items),
+                'current_item': current.title if current is not None else '',
+                'items_done': self.counts['done'],
+                'items_failed': self.counts['failed'],
+                'bytes_per_sec': self.bytes_per_sec(),
+                'items_per_min': self.items_per_min(),
+                'eta': round(eta) if eta is not None else None,
+                'item_states': states,
+            }
+
+
+# CPU time of the FFmpeg processes started by each thread, see MeasuredPopen
+child_cpu = threading_local()
+
+
+def thread_child_cpu():
+    """
+    CPU time used by the calling thread's finished FFmpeg processes
+    
+    Returns:
+        Tuple of (seconds, number of runs whose CPU time could not be measured)
+    """
+    return getattr(child_cpu, 'seconds', 0.0), getattr(child_cpu, 'unmeasured', 0)
+
+
+def windows_process_cpu_seconds(handle):
+    """User plus kernel CPU time of a Windows process, or None if it cannot be read"""
+    import ctypes
+    from ctypes import wintypes
+    creation, exited, kernel, user = (wintypes.FILETIME() for _ in range(4))
+    if not ctypes.windll.kernel32.GetProcessTimes(
+            wintypes.HANDLE(int(handle)), ctypes.byref(creation), ctypes.byref(exited),
+            ctypes.byref(kernel), ctypes.byref(user)):
+        return None
+    # FILETIME counts 100 ns intervals
+    ticks = sum((t.dwHighDateTime << 32) | t.dwLowDateTime for t in (kernel, user))
+    return ticks / 10_000_000
+
+
+class MeasuredPopen(yt_dlp.utils.Popen):
+    """
+    yt-dlp's Popen, measuring the CPU time of each process it runs.
+    
+    Every process is measured on its own (GetProcessTimes on Windows,
+    wait4() elsewhere) and credited to the thread that started it, so
+    FFmpeg runs on other threads never leak into the numbers.
+    """
+    
+    cpu_seconds = None
+    
+    def _try_wait(self, wait_flags):
+        # POSIX only: reap with wait4() so the child's own rusage is returned
+        try:
+            pid, sts, usage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            return self.pid, 0
+        if pid == self.pid:
+            self.cpu_seconds = usage.ru_utime + usage.ru_stime
+        return pid, sts
+    
+    def __exit__(self, *args):
+        super().__exit__(*args)
+        if os.name == 'nt':
+            self.cpu_seconds = windows_process_cpu_seconds(self._handle)
+        if self.cpu_seconds is None:
+            child_cpu.unmeasured = getattr(child_cpu, 'unmeasured', 0) + 1
+        else:
+            child_cpu.seconds = getattr(child_cpu, 'seconds', 0.0) + self.cpu_seconds
+
+
+def install_ffmpeg_cpu_meter():
+    """Make yt-dlp's FFmpeg postprocessors start their processes through MeasuredPopen"""
+    from yt_dlp.postprocessor import ffmpeg
+    ffmpeg.Popen = MeasuredPopen
+
+
+def ffmpeg_postprocessor_keys():
+    """
+    Names yt-dlp reports in postprocessor hooks for the postprocessors that run FFmpeg
+    
+    pp_key() drops the 'FFmpeg' prefix ('FFmpegExtractAudioPP' is 'ExtractAudio'),
+    so the postprocessor classes are checked instead of the names.
+    """
+    from yt_dlp import postprocessor
+    return {
+        cls.pp_key() for cls in vars(postprocessor).values()
+        if isinstance(cls, type) and issubclass(cls, FFmpegPostProcessor)
+    }
+
+
+class JobProfiler:
+    """
+    Profile one download job.
+    
+    Captures a cProfile of the job's thread, a sampled collapsed-stack
+    file for flamegraph tools, the wall and CPU time of every FFmpeg
+    postprocessor run and loudness normalization run on the CPU pool
+    (measured per FFmpeg process, see MeasuredPopen), and how long the
+    Python side spent waiting on sockets. Artifacts are written to
+    artifact_dir by stop().
+    """
+    
+    SAMPLE_INTERVAL = 0.005
+    # Builtins that block on the network; their total time is the network wait
+    NETWORK_CALLS = ('recv', 'recv_into', 'read', 'write', 'send', 'sendall',
+                     'connect', 'connect_ex', 'do_handshake', 'getaddrinfo')
+    NETWORK_MODULES = ('socket', '_socket', 'ssl', '_ssl')
+    
+    def __init__(self, artifact_dir):
+        self.artifact_dir = Path(artifact_dir)
+        self.profile = cProfile.Profile()
+        self.samples = {}
+        self.sampler = None
+        self.sampling = Event()
+        self.thread_id = None
+        self.ffmpeg_runs = []
+        self.ffmpeg_postprocessors = set()
+        self.running_pps = {}
+        self.download_seconds = 0.0
+        self.downloaded_bytes = 0
+        self.download_started = {}
+    
+    def start(self):
+        """Start profiling the calling thread"""
+        install_ffmpeg_cpu_meter()
+        self.ffmpeg_postprocessors = ffmpeg_postprocessor_keys()
+        self.thread_id = get_ident()
+        self.wall_started = time.perf_counter()
+        self.cpu_started = time.thread_time()
+        self.sampling.set()
+        self.sampler = Thread(target=self.sample_stacks, daemon=True)
+        self.sampler.start()
+        self.profile.enable()
+    
+    def sample_stacks(self):
+        """Periodically record the profiled thread's stack"""
+        while self.sampling.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                key = ';'.join(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+            time.sleep(self.SAMPLE_INTERVAL)
+    
+    def postprocessor_hook(self, d):
+        """yt-dlp postprocessor hook: time every FFmpeg postprocessor run"""
+        name = d.get('postprocessor', '')
+        if name not in self.ffmpeg_postprocessors:
+            return
+        filename = (d.get('info_dict') or {}).get('filepath', '')
+        key = (name, filename)
+        if d['status'] == 'started':
+            self.running_pps[key] = (time.perf_counter(), thread_child_cpu())
+        elif d['status'] == 'finished' and key in self.running_pps:
+            wall_started, (cpu_started, unmeasured_started) = self.running_pps.pop(key)
+            cpu_finished, unmeasured_finished = thread_child_cpu()
+            self.record_ffmpeg_run(
+                name, filename, time.perf_counter() - wall_started,
+                cpu_finished - cpu_started if unmeasured_finished == unmeasured_started else None
+            )
+    
+    def record_ffmpeg_run(self, name, filename, wall_seconds, cpu_seconds):
+        """Add an FFmpeg run; cpu_seconds is None if it could not be measured (any thread)"""
+        self.ffmpeg_runs.append({
+            'postprocessor': name,
+            'file': os.path.basename(filename),
+            'wall_seconds': round(wall_seconds, 3),
+            'cpu_seconds': round(cpu_seconds, 3) if cpu_seconds is not None else None,
+        })
+    
+    def progress_hook(self, d):
+        """yt-dlp progress hook: measure time spent downloading media"""
+        filename = d.get('filename', '')
+        if d['status'] == 'downloading':
+            self.download_started.setdefault(filename, time.perf_counter())
+        elif d['status'] in ('finished', 'error'):
+            started = self.download_started.pop(filename, None)
+            if started is not None:
+                self.download_seconds += time.perf_counter() - started
+            self.downloaded_bytes += d.get('total_bytes') or d.get('downloaded_bytes') or 0
+    
+    def network_wait(self, stats):
+        """Total time spent inside blocking socket/SSL calls, by call"""
+        by_call = {}
+        for (filename, _, name), (_, _, tottime, _, _) in stats.stats.items():
+            if filename != '~' or not any(m in name for m in self.NETWORK_MODULES):
+                continue
+            # "<method 'recv_into' of '_socket.socket' objects>" or "<built-in method _socket.getaddrinfo>"
+            call = name.split("'")[1] if "'" in name else name.rstrip('>').split('.')[-1]
+            if call in self.NETWORK_CALLS:
+                by_call[call] = by_call.get(call, 0) + tottime
+        return {call: round(seconds, 3) for call, seconds in sorted(by_call.items(), key=lambda x: -x[1])}
+    
+    def stop(self):
+        """
+        Stop profiling and write the artifacts
+        
+        Returns:
+            Summary dictionary, including the artifact paths
+        """
+        self.profile.disable()
+        self.sampling.clear()
+        if self.sampler:
+            self.sampler.join()
+        
+        wall = time.perf_counter() - self.wall_started
+        cpu = time.thread_time() - self.cpu_started
+        
+        self.artifact_dir.mkdir(parents=True, exist_ok=True)
+        pstats_path = self.artifact_dir / 'profile.pstats'
+        collapsed_path = self.artifact_dir / 'profile.collapsed'
+        summary_path = self.artifact_dir / 'summary.json'
+        
+        self.profile.dump_stats(str(pstats_path))
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+        
+        network = self.network_wait(pstats.Stats(self.profile))
+        summary = {
+            'wall_seconds': round(wall, 3),
+            'python_cpu_seconds': round(cpu, 3),
+            'network_wait_seconds': round(sum(network.values()), 3),
+            'network_wait_by_call': network,
+            'media_download_seconds': round(self.download_seconds, 3),
+            'media_downloaded_bytes': self.downloaded_bytes,
+            'ffmpeg_wall_seconds': round(sum(run['wall_seconds'] for run in self.ffmpeg_runs), 3),
+            'ffmpeg_runs': self.ffmpeg_runs,
+            'artifacts': {
+                'pstats': str(pstats_path),
+                'collapsed': str(collapsed_path),
+                'summary': str(summary_path),
+            },
+        }
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+class LoudnessCache:
+    """
+    Persistent first-pass loudnorm measurements, keyed by video ID and target.
+    
+    Stored in SQLite so several processes (e.g. distributed workers) can
+    share one cache file.
+    """
+    
+    def __init__(self, path):
+        self.path = str(path)
+        conn = self.connect()
+        try:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS loudness (
+                       video_id TEXT NOT NULL,
+                       target TEXT NOT NULL,
+                       measurements TEXT NOT NULL,
+                       created_at REAL NOT NULL,
+                       PRIMARY KEY (video_id, target)
+                   )"""
+            )
+        finally:
+            conn.close()
+    
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+    
+    def get(self, video_id, target):
+        """Return cached measurements or None"""
+        conn = self.connect()
+        try:
+            row = conn.execute(
+                'SELECT measurements FROM loudness WHERE video_id = ? AND target = ?',
+                (video_id, target)
+            ).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+    
+    def put(self, video_id, target, measurements):
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO loudness (video_id, target, measurements, created_at) VALUES (?, ?, ?, ?)',
+                    (video_id, target, json.dumps(measurements), time.time())
+                )
+        finally:
+            conn.close()
+
+
+class LoudnessNormalizer:
+    """
+    Two-pass EBU R128 normalization with FFmpeg's loudnorm filter.
+    
+    The first pass only measures the downloaded source and its result is
+    cached per video ID, so re-encoding the same video (another bitrate,
+    a re-sync) skips it. The second pass is the MP3 conversion itself,
+    so every file goes through exactly one lossy encode.
+    """
+    
+    TARGET = 'I=-16:TP=-1.5:LRA=11'
+    MEASUREMENT_KEYS = ('input_i', 'input_tp', 'input_lra', 'input_thresh', 'target_offset')
+    
+    def __init__(self, ffmpeg_path, cache, target=None):
+        self.ffmpeg_path = ffmpeg_path
+        self.cache = cache
+        self.target = target or self.TARGET
+    
+    def run_ffmpeg(self, args):
+        """Run FFmpeg and return its stderr; raises on failure"""
+        # MeasuredPopen hides the console window on Windows and lets the profiler see the run's CPU time
+        _, stderr, returncode = MeasuredPopen.run(
+            [self.ffmpeg_path, '-hide_banner', '-nostats'] + args,
+            text=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        if returncode != 0:
+            lines = stderr.strip().splitlines()
+            raise Exception(f"FFmpeg failed: {lines[-1] if lines else f'exit code {returncode}'}")
+        return stderr
+    
+    def measure(self, filename):
+        """First pass: measure integrated loudness, true peak and range"""
+        stderr = self.run_ffmpeg([
+            '-i', str(filename),
+            '-vn',
+            '-af', f'loudnorm={self.target}:print_format=json',
+            '-f', 'null', '-'
+        ])
+        # loudnorm prints its JSON block last
+        start = stderr.rfind('{')
+        end = stderr.rfind('}')
+        if start < 0 or end < start:
+            raise Exception("FFmpeg loudnorm did not report measurements")
+        data = json.loads(stderr[start:end + 1])
+        return {key: data[key] for key in self.MEASUREMENT_KEYS}
+    
+    def get_measurements(self, filename, video_id):
+        """
+        Return the first-pass measurements, measuring the file only if its video ID is not cached
+        
+        Returns:
+            Tuple of (measurements, whether they came from the cache)
+        """
+        measurements = self.cache.get(video_id, self.target) if video_id else None
+        if measurements is not None:
+            return measurements, True
+        measurements = self.measure(filename)
+        if video_id:
+            self.cache.put(video_id, self.target, measurements)
+        return measurements, False
+    
+    def loudnorm_filter(self, measurements):
+        """Second-pass filter applying the measured correction"""
+        return (
+            f"loudnorm={self.target}"
+            f":measured_I={measurements['input_i']}"
+            f":measured_TP={measurements['input_tp']}"
+            f":measured_LRA={measurements['input_lra']}"
+            f":measured_thresh={measurements['input_thresh']}"
+            f":offset={measurements['target_offset']}"
+            ":linear=true"
+        )
+    
+    def encode(self, filename, out_filename, bitrate, measurements=None):
+        """
+        Second pass: convert the downloaded source to MP3, applying the measured correction
+        
+        Without measurements the file is converted un-normalized. The MP3 is
+        written under a temporary name and moved into place when complete.
+        """
+        out_filename = Path(out_filename)
+        tmp_file = out_filename.with_name(f".{out_filename.stem}.{uuid.uuid4().hex[:8]}.encoding.mp3")
+        args = ['-y', '-i', str(filename), '-vn', '-acodec', ACODECS['mp3'][1], '-b:a', bitrate]
+        if measurements:
+            # loudnorm resamples to 192 kHz internally
+            args += ['-af', self.loudnorm_filter(measurements), '-ar', '44100']
+        try:
+            self.run_ffmpeg(args + ['-map_metadata', '0', str(tmp_file)])
+            os.replace(tmp_file, out_filename)
+        finally:
+            if tmp_file.exists():
+                os.remove(tmp_file)
+
+
 class YouTubeDownloader:
-    def __init__(self, output_dir=None, bitrate="172k", ffmpeg_path=None):
+    # Retry delays in seconds: base * 2^(attempt-1), capped, with jitter
+    RETRY_BASE_DELAY = 5
+    RETRY_MAX_DELAY = 120
+    
+    def __init__(self, output_dir=None, bitrate="172k", ffmpeg_path=None, max_attempts=3, staging_dir=None,
+                 normalize=False, circuit_breakers=None):
         """
         Initialize the YouTube downloader
         
@@ -98,6 +1019,12 @@ class YouTubeDownloader:
             output_dir: Directory to save downloaded files (default: user's Documents/YouTube Downloads)
             bitrate: Audio bitrate for MP3 conversion (default: 172k)
             ffmpeg_path: Optional path to FFmpeg executable
+            max_attempts: Attempts per item before it is reported as failed (default: 3)
+            staging_dir: Optional local scratch directory; files are downloaded and
+                converted there and only finished files are moved into output_dir
+            normalize: Apply two-pass EBU R128 loudness normalization to every file
+            circuit_breakers: Optional callable returning the circuit breaker for an
+                extractor name (default: get_circuit_breaker, shared within this process)
         """
         if output_dir is None:
             output_dir = get_default_downloads_dir()
@@ -115,8 +1042,27 @@ class YouTubeDownloader:
             ) from e
         
         self.bitrate = bitrate
+        self.max_attempts = max_attempts
+        self.get_circuit_breaker = circuit_breakers or get_circuit_breaker
         self.progress_callback = None
         
+        # Profiler for the current job when profiling is requested
+        self.profiler = None
+        
+        # Progress of the current job across all of its items
+        self.job_progress = JobProgress()
+        
+        # Local scratch area and the current job's directory inside it
+        self.staging = get_staging_area(staging_dir) if staging_dir else None
+        self.job_dir = None
+        
+        # Playlist the current single-video job belongs to, see download()
+        self.playlist_entry = None
+        
+        # Item currently being processed and errors seen in the current pass
+        self.current_item = None
+        self.pass_errors = {}
+        
         # Find FFmpeg
         if ffmpeg_path:
             self.ffmpeg_path = ffmpeg_path
@@ -130,47 +1076,133 @@ class YouTubeDownloader:
                 "See FFMPEG_SETUP.md for installation instructions."
             )
         
+        # Loudness normalization: downloaded files are measured and converted to
+        # MP3 on the CPU pool while the next item downloads
+        self.normalizer = None
+        self.pending_normalizations = []
+        self.normalization_failures = []
+        if normalize:
+            self.normalizer = LoudnessNormalizer(
+                self.ffmpeg_path,
+                LoudnessCache(self.output_dir / '.loudness_cache.db')
+            )
+        
     def set_progress_callback(self, callback):
         """Set a callback function for progress updates"""
         self.progress_callback = callback
         
+    def before_item(self, info_dict, *args, **kwargs):
+        """
+        yt-dlp match_filter run before each item is extracted/downloaded.
+        
+        Remembers which item is in flight (so errors can be attributed to it)
+        and waits while the extractor's circuit breaker is open.
+        """
+        extractor = info_dict.get('extractor_key') or info_dict.get('ie_key') or info_dict.get('extractor')
+        self.current_item = {
+            'id': info_dict.get('id') or info_dict.get('url', ''),
+            'index': info_dict.get('playlist_index'),
+            'title': info_dict.get('title') or '',
+            'extractor': extractor,
+        }
+        self.get_circuit_breaker(extractor).wait()
+        if self.current_item['id']:
+            self.job_progress.start_item(
+                self.current_item['id'],
+                title=self.current_item['title'],
+                total_items=info_dict.get('n_entries') or 1
+            )
+        return None  # Never filter anything out
+    
+    def record_error(self, message):
+        """Record an error reported by yt-dlp against the item in flight"""
+        item = dict(self.current_item or {'id': '', 'index': None, 'title': '', 'extractor': None})
+        error_class = classify_error(message)
+        item['error'] = message
+        item['error_class'] = error_class
+        self.pass_errors[item['id']] = item
+        self.job_progress.fail_item(item['id'])
+        if error_class == 'throttled':
+            cooldown = self.get_circuit_breaker(item['extractor']).record_throttle()
+            if self.progress_callback:
+                self.progress_callback({
+                    'status': 'throttled',
+                    'extractor': item['extractor'] or 'generic',
+                    'wait': cooldown,
+                    'job': self.job_progress.snapshot()
+                })
+    
     def progress_hook(self, d):
         """Hook for yt-dlp progress updates"""
+        if self.profiler:
+            self.profiler.progress_hook(d)
+        
+        if d['status'] == 'downloading':
+            total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+            downloaded = d.get('downloaded_bytes') or 0
+            self.job_progress.update_download(downloaded, total)
+        elif d['status'] == 'finished':
+            info = d.get('info_dict') or {}
+            self.get_circuit_breaker(info.get('extractor_key') or info.get('extractor')).record_success()
+            self.job_progress.finish_download()
+        
         if self.progress_callback:
             if d['status'] == 'downloading':
-                total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-                downloaded = d.get('downloaded_bytes', 0)
                 if total > 0:
                     percent = (downloaded / total) * 100
                     self.progress_callback({
                         'status': 'downloading',
                         'percent': percent,
                         'speed': d.get('speed', 0),
-                        'eta': d.get('eta', 0)
+                        'eta': d.get('eta', 0),
+                        'job': self.job_progress.snapshot()
                     })
             elif d['status'] == 'finished':
                 self.progress_callback({
                     'status': 'converting',
-                    'percent': 100
+                    'percent': 100,
+                    'job': self.job_progress.snapshot()
                 })
     
+    def item_finished(self, filename):
+        """yt-dlp post hook: an item has been downloaded and converted"""
+        if self.normalizer:
+            # Still the downloaded source: normalize_and_publish() converts it
+            item = dict(self.current_item or {'id': '', 'index': None, 'title': ''})
+            self.pending_normalizations.append(
+                get_cpu_pool().submit(self.normalize_and_publish, filename, item, self.profiler)
+            )
+            return
+        if self.job_dir:
+            self.publish_staged_file(filename)
+        self.job_progress.finish_item()
+        if self.progress_callback:
+            self.progress_callback({
+                'status': 'item_finished',
+                'job': self.job_progress.snapshot()
+            })
+    
     def get_ydl_opts(self, playlist=False, playlist_items=None):
         """
         Get yt-dlp options for downloading and converting to MP3
         
         Args:
             playlist: Whether downloading a playlist (affects output template)
-            playlist_items: Optional list of playlist indices to download (1-indexed)
+            playlist_items: Optional (start, end) ranges from parse_playlist_items (1-indexed)
         
         Returns:
             Dictionary of yt-dlp options
         """
-        if playlist:
+        # When staging, everything is written to the job's scratch directory
+        # and item_finished() moves finished files into output_dir
+        base_dir = self.job_dir if self.job_dir else self.output_dir
+        
+        if playlist or self.playlist_entry:
             # For playlists: organize by playlist name, then track number - title
-            output_template = str(self.output_dir / "%(playlist_title)s" / "%(playlist_index)s - %(title)s.%(ext)s")
+            output_template = str(base_dir / "%(playlist_title)s" / "%(playlist_index)s - %(title)s.%(ext)s")
         else:
             # For single videos: just use the title
-            output_template = str(self.output_dir / "%(title)s.%(ext)s")
+            output_template = str(base_dir / "%(title)s.%(ext)s")
         
         opts = {
             'format': 'bestaudio/best',  # Get best audio quality available
@@ -178,7 +1210,7 @@ class YouTubeDownloader:
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'mp3',
                 'preferredquality': self.bitrate.replace('k', ''),  # yt-dlp expects just the number
-            }],
+            }] if not self.normalizer else [],  # Normalized files are converted by normalize_and_publish()
             'outtmpl': output_template,
             'quiet': False,
             'no_warnings': False,
@@ -188,18 +1220,20 @@ class YouTubeDownloader:
             'writesubtitles': False,
             'writeautomaticsub': False,
             'progress_hooks': [self.progress_hook],
+            'post_hooks': [self.item_finished],
             'ffmpeg_location': self.ffmpeg_path,
-            'ignoreerrors': True,  # Continue on download errors (skip unavailable videos)
+            'ignoreerrors': True,  # Continue on download errors; failures are collected and retried
+            'match_filter': self.before_item,
             'no_warnings': False,
         }
         
+        if self.profiler:
+            opts['postprocessor_hooks'] = [self.profiler.postprocessor_hook]
+        
         # Add playlist selection if specified
         if playlist and playlist_items:
             # yt-dlp uses 1-indexed playlist items, format: "1,3,5" or "1-5"
-            if isinstance(playlist_items, list):
-                opts['playlist_items'] = ','.join(map(str, playlist_items))
-            else:
-                opts['playlist_items'] = str(playlist_items)
+            opts['playlist_items'] = format_playlist_items(playlist_items)
         
         return opts
     
@@ -291,55 +1325,611 @@ class YouTubeDownloader:
                 raise Exception("This video is unavailable. It may have been removed or is blocked in your country.")
             raise Exception(f"Error fetching video info: {str(e)}")
     
-    def download(self, url, progress_callback=None, selected_indices=None):
+    def normalize_and_publish(self, filename, item, profiler=None):
+        """
+        CPU pool task: measure a downloaded source, convert it to MP3 once, then publish it if staging
+        
+        A source that cannot be measured is converted un-normalized rather than
+        lost; one that cannot be converted is added to the job's failed items.
+        
+        Returns:
+            Dictionary with the time spent in each pass and whether the cache was used
+        """
+        source = Path(filename)
+        mp3_file = source.with_suffix('.mp3')
+        stats = {'file': mp3_file.name, 'id': item['id'], 'cached': False,
+                 'analysis_seconds': 0.0, 'encode_seconds': 0.0}
+        
+        measurements = None
+        started, cpu_started = time.perf_counter(), thread_child_cpu()
+        try:
+            measurements, stats['cached'] = self.normalizer.get_measurements(source, item['id'])
+        except Exception as e:
+            stats['error'] = str(e)
+            print(f"Warning: Could not measure loudness of {source.name}: {e}")
+        if not stats['cached']:
+            stats['analysis_seconds'] = self.pool_run_seconds(profiler, 'LoudnessAnalysis', source,
+                                                              started, cpu_started)
+        
+        started, cpu_started = time.perf_counter(), thread_child_cpu()
+        try:
+            self.normalizer.encode(source, mp3_file, self.bitrate, measurements)
+            stats['encode_seconds'] = self.pool_run_seconds(profiler, 'LoudnessEncode', source,
+                                                            started, cpu_started)
+            if mp3_file != source:
+                os.remove(source)
+            if self.job_dir:
+                self.publish_staged_file(mp3_file)
+        except Exception as e:
+            error = str(e)
+            stats['error'] = error
+            self.normalization_failures.append({
+                'id': item['id'],
+                'index': item['index'],
+                'title': item['title'],
+                'error': error,
+                'error_class': classify_error(error),
+                'attempts': 1,
+            })
+            self.job_progress.fail_item(item['id'])
+        else:
+            self.job_progress.finish_item(item['id'])
+        
+        if self.progress_callback:
+            self.progress_callback({
+                'status': 'item_finished',
+                'job': self.job_progress.snapshot()
+            })
+        return stats
+    
+    @staticmethod
+    def pool_run_seconds(profiler, name, filename, started, cpu_started):
+        """Wall time of an FFmpeg run on the CPU pool, also recorded by the job's profiler"""
+        wall = time.perf_counter() - started
+        if profiler:
+            cpu_finished = thread_child_cpu()
+            cpu_seconds = cpu_finished[0] - cpu_started[0] if cpu_finished[1] == cpu_started[1] else None
+            profiler.record_ffmpeg_run(name, filename, wall, cpu_seconds)
+        return round(wall, 3)
+    
+    def normalization_summary(self, items):
+        """
+        Summarize the current job's loudness normalization
+        
+        Returns:
+            Summary with per-file stats and total time spent in each pass
+        """
+        return {
+            'items': items,
+            'cache_hits': sum(1 for item in items if item.get('cached')),
+            'analysis_seconds': round(sum(item.get('analysis_seconds', 0) for item in items), 3),
+            'encode_seconds': round(sum(item.get('encode_seconds', 0) for item in items), 3),
+            'errors': sum(1 for item in items if 'error' in item),
+        }
+    
+    def publish_staged_file(self, filename):
+        """yt-dlp post hook: move a finished file from staging into output_dir"""
+        relative = Path(filename).relative_to(self.job_dir)
+        try:
+            publish_file(filename, self.output_dir / relative)
+        except OSError as e:
+            raise yt_dlp.utils.PostProcessingError(f"Could not move '{relative}' into the downloads folder: {e}")
+    
+    def retry_delay(self, attempt):
+        """Exponential backoff with jitter for the given (1-based) retry attempt"""
+        delay = min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def run_pass(self, url, is_playlist, playlist_items=None):
+        """
+        Run one yt-dlp extract-and-download pass
+        
+        Returns:
+            Tuple of (info dict or None, dict of errors keyed by item ID)
+        """
+        self.current_item = None
+        self.pass_errors = {}
+        ydl_opts = self.get_ydl_opts(playlist=is_playlist, playlist_items=playlist_items)
+        with TrackedYoutubeDL(ydl_opts, on_error=self.record_error) as ydl:
+            if self.playlist_entry:
+                ydl.add_post_processor(PlaylistEntryPP(
+                    ydl,
+                    playlist_title=self.playlist_entry['title'],
+                    playlist_index=self.playlist_entry['index'],
+                    playlist_count=self.playlist_entry.get('count')
+                ), when='pre_process')
+            info = ydl.extract_info(url, download=True)
+        return info, self.pass_errors
+    
+    def get_video_info_batch(self, urls, max_workers=4):
+        """
+        Resolve information for many URLs concurrently
+        
+        URLs pointing at the same video or playlist are resolved once. Results
+        are yielded as soon as each lookup finishes, so a slow URL does not
+        hold back the others.
+        
+        Args:
+            urls: List of YouTube URLs
+            max_workers: Maximum number of lookups running at once
+        
+        Yields:
+            Dictionary per unique URL with 'url', 'key', 'duplicates', 'success',
+            'info' or 'error', and 'seconds' spent resolving it
+        """
+        unique = {}
+        for url in urls:
+            url = url.strip()
+            if not url:
+                continue
+            key = get_url_key(url)
+            if key in unique:
+                if url != unique[key]['url'] and url not in unique[key]['duplicates']:
+                    unique[key]['duplicates'].append(url)
+            else:
+                unique[key] = {'url': url, 'key': key, 'duplicates': []}
+        
+        if not unique:
+            return
+        
+        def resolve(entry):
+            started = time.perf_counter()
+            try:
+                info = self.get_video_info(entry['url'])
+                return dict(entry, success=True, info=info, seconds=round(time.perf_counter() - started, 3))
+            except Exception as e:
+                return dict(entry, success=False, error=str(e), seconds=round(time.perf_counter() - started, 3))
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique))))
+        try:
+            futures = [executor.submit(resolve, entry) for entry in unique.values()]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Stop queued lookups if the consumer goes away early
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def download(self, url, progress_callback=None, selected_indices=None, profile=False, playlist_entry=None):
         """
         Download YouTube video or playlist
         
+        Items that fail with a transient error (throttling, 403, network) are
+        retried with exponential backoff until max_attempts is reached.
+        
         Args:
             url: YouTube URL (video or playlist)
             progress_callback: Optional callback function for progress updates
-            selected_indices: Optional list of playlist indices to download (1-indexed)
+            selected_indices: Optional list of playlist indices to download (1-indexed),
+                or a ranges string such as "1-200,305"
+            profile: Profile the job and save the artifacts under output_dir/.profiles
+            playlist_entry: Optional dict with the playlist 'title', 'index' and 'count' when
+                url is a single entry of a playlist; it is saved in that playlist's folder
+        
+        Returns:
+            Dictionary with the job result; 'failed' lists the items that could not
+            be downloaded with their error, error class and attempt count, and
+            'profile' holds the profiling summary when profiling was requested
         """
         if progress_callback:
             self.set_progress_callback(progress_callback)
         
-        # Check if URL is a playlist
-        is_playlist = 'playlist' in url.lower() or 'list=' in url.lower()
+        if selected_indices:
+            selected_indices = parse_playlist_items(selected_indices)
         
-        ydl_opts = self.get_ydl_opts(playlist=is_playlist, playlist_items=selected_indices)
+        self.job_progress = JobProgress(total_items=count_playlist_items(selected_indices) if selected_indices else 0)
+        self.playlist_entry = playlist_entry
+        try:
+            if not profile:
+                return self.download_staged(url, selected_indices)
+            
+            job_name = datetime.now().strftime('job-%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+            self.profiler = JobProfiler(self.output_dir / '.profiles' / job_name)
+            self.profiler.start()
+            try:
+                result = self.download_staged(url, selected_indices)
+            finally:
+                summary = self.profiler.stop()
+                self.profiler = None
+            result['profile'] = summary
+            return result
+        finally:
+            self.playlist_entry = None
+    
+    def download_entries(self, title, entries, playlist_count=None, progress_callback=None):
+        """
+        Download listed playlist entries one by one by their video URL
+        
+        Each entry is saved in the playlist's folder under its playlist index,
+        so entries added to or moved in the playlist after it was listed can
+        never be swapped for the ones that were picked.
+        
+        Args:
+            title: Playlist title, used as the folder name
+            entries: List of (1-based playlist index, entry) tuples from select_playlist_entries()
+            playlist_count: Number of entries in the playlist (pads the track numbers)
+            progress_callback: Optional callback function for progress updates
         
+        Returns:
+            Dictionary with the job result; 'failed' lists the entries that could not
+            be downloaded like download() does
+        """
+        if progress_callback:
+            self.set_progress_callback(progress_callback)
+        
+        self.job_progress = JobProgress(total_items=len(entries))
+        failed = []
+        normalized = []
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # Extract info first
-                info = ydl.extract_info(url, download=False)
+            for index, entry in entries:
+                self.playlist_entry = {'title': title, 'index': index, 'count': playlist_count}
+                try:
+                    result = self.download_staged(entry['url'])
+                    failed.extend(result['failed'])
+                    normalized.extend(result.get('normalization', {}).get('items', []))
+                except Exception as e:
+                    error = str(e)
+                    error_class = classify_error(error)
+                    item = self.job_progress.items.get(entry['id'])
+                    self.job_progress.fail_item(entry['id'])
+                    failed.append({
+                        'id': entry['id'],
+                        'index': index,
+                        'title': item.title if item is not None else '',
+                        'error': error,
+                        'error_class': error_class,
+                        'attempts': self.max_attempts if error_class in RETRYABLE_ERRORS else 1,
+                    })
+        finally:
+            self.playlist_entry = None
+        
+        result = {
+            'success': True,
+            'type': 'playlist',
+            'title': title,
+            'count': len(entries),
+            'output_dir': str(self.output_dir.absolute()),
+            'failed': failed
+        }
+        if self.normalizer:
+            result['normalization'] = self.normalization_summary(normalized)
+        return result
+    
+    def download_staged(self, url, selected_indices=None):
+        """Run the download inside a staging job directory when staging is enabled"""
+        if self.staging:
+            with self.staging.admit() as job_dir:
+                self.job_dir = job_dir
+                try:
+                    return self.download_and_normalize(url, selected_indices)
+                finally:
+                    self.job_dir = None
+        return self.download_and_normalize(url, selected_indices)
+    
+    def download_and_normalize(self, url, selected_indices=None):
+        """Download, then wait for the files still being normalized on the CPU pool"""
+        self.normalization_failures = []
+        try:
+            result = self.download_items(url, selected_indices)
+        finally:
+            # Before the staging job directory is cleaned up
+            stats = [future.result() for future in self.pending_normalizations]
+            self.pending_normalizations = []
+        if self.normalizer:
+            result['normalization'] = self.normalization_summary(stats)
+            result['failed'].extend(self.normalization_failures)
+        return result
+    
+    def download_items(self, url, selected_indices=None):
+        """Download a video or playlist selection, retrying transient failures"""
+        # Check if URL is a playlist
+        is_playlist = is_playlist_url(url)
+        
+        try:
+            info, errors = self.run_pass(url, is_playlist, selected_indices)
+            failed = {}
+            for item_id, item in errors.items():
+                item['attempts'] = 1
+                failed[item_id] = item
+            
+            for attempt in range(2, self.max_attempts + 1):
+                retry = [item for item in failed.values() if item['error_class'] in RETRYABLE_ERRORS]
+                if not retry:
+                    break
                 
-                # If playlist with selected items, filter the count
-                if is_playlist and selected_indices:
-                    actual_count = len(selected_indices)
-                elif is_playlist:
-                    actual_count = info.get('playlist_count', len(info.get('entries', [])))
+                if is_playlist and all(item['index'] for item in retry):
+                    retry_items = parse_playlist_items([item['index'] for item in retry])
                 else:
-                    actual_count = 1
+                    # Failure outside a known item: repeat the original request
+                    retry_items = selected_indices
                 
-                result = {
-                    'success': True,
-                    'type': 'playlist' if is_playlist else 'video',
-                    'title': info.get('title', 'Unknown') if not is_playlist else info.get('title', 'Unknown Playlist'),
-                    'count': actual_count,
-                    'output_dir': str(self.output_dir.absolute())
-                }
-                
-                # Download
-                ydl.download([url])
+                delay = self.retry_delay(attempt - 1)
+                if self.progress_callback:
+                    self.progress_callback({
+                        'status': 'retrying',
+                        'retry_items': len(retry),
+                        'attempt': attempt,
+                        'max_attempts': self.max_attempts,
+                        'wait': delay,
+                        'job': self.job_progress.snapshot()
+                    })
+                time.sleep(delay)
                 
-                return result
+                retry_info, retry_errors = self.run_pass(url, is_playlist, retry_items)
+                if info is None:
+                    info = retry_info
+                for item in retry:
+                    if item['id'] not in retry_errors:
+                        del failed[item['id']]
+                for item_id, item in retry_errors.items():
+                    item['attempts'] = attempt
+                    failed[item_id] = item
+            
+            if not is_playlist and failed:
+                error = next(iter(failed.values()))
+                raise Exception(f"Download error: {error['error']}")
+            
+            info = info or {}
+            
+            # If playlist with selected items, filter the count
+            if is_playlist and selected_indices:
+                actual_count = count_playlist_items(selected_indices)
+            elif is_playlist:
+                actual_count = info.get('playlist_count', len(info.get('entries') or []))
+            else:
+                actual_count = 1
+            
+            return {
+                'success': True,
+                'type': 'playlist' if is_playlist else 'video',
+                'title': info.get('title', 'Unknown') if not is_playlist else info.get('title', 'Unknown Playlist'),
+                'count': actual_count,
+                'output_dir': str(self.output_dir.absolute()),
+                'failed': [{
+                    'id': item['id'],
+                    'index': item['index'],
+                    'title': item['title'],
+                    'error': item['error'],
+                    'error_class': item['error_class'],
+                    'attempts': item['attempts'],
+                } for item in failed.values()]
+            }
                 
         except yt_dlp.utils.DownloadError as e:
             raise Exception(f"Download error: {str(e)}")
         except Exception as e:
+            if str(e).startswith("Download error:"):
+                raise
             raise Exception(f"Unexpected error: {str(e)}")
 
 
+def list_playlist_entries(url):
+    """
+    List a playlist's entries without resolving each video
+    
+    Returns:
+        Tuple of (playlist title, list of entries in playlist order); each entry is a
+        dict with the video 'id' and 'url', both empty for unavailable entries
+    """
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'ignoreerrors': True,
+        'extract_flat': 'in_playlist',
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    if not info:
+        raise Exception(f"Could not list playlist: {url}")
+    entries = [{
+        'id': entry.get('id') or '',
+        'url': entry.get('url') or entry.get('webpage_url') or '',
+    } if entry else {'id': '', 'url': ''} for entry in (info.get('entries') or [])]
+    return info.get('title', 'Unknown Playlist'), entries
+
+
+def select_playlist_entries(entries, selected_indices=None):
+    """
+    Pick the available entries of a listed playlist
+    
+    Args:
+        entries: Entries from list_playlist_entries()
+        selected_indices: Optional selection accepted by parse_playlist_items()
+    
+    Returns:
+        List of (1-based playlist index, entry) tuples
+    """
+    if not entries:
+        return []
+    if selected_indices:
+        ranges = parse_playlist_items(selected_indices, max_index=len(entries))
+    else:
+        ranges = [(1, len(entries))]
+    return [(index, entries[index - 1]) for start, end in ranges for index in range(start, end + 1)
+            if entries[index - 1]['url']]
+
+
+class PlaylistWatcher:
+    """
+    Keep local copies of playlists in sync by polling them periodically.
+    
+    Each poll lists the playlist with flat extraction (entry IDs only, no
+    per-video resolution), diffs the IDs against the snapshot stored in the
+    state file and downloads just the entries that are new.
+    """
+    
+    STATE_FILENAME = '.watch_state.json'
+    
+    def __init__(self, downloader, state_file=None, default_interval=60, download=None):
+        """
+        Initialize the watcher
+        
+        Args:
+            downloader: YouTubeDownloader used for the actual downloads; may be None when
+                both state_file and download are given
+            state_file: Path to the JSON snapshot file (default: output_dir/.watch_state.json)
+            default_interval: Poll interval in minutes for playlists without their own
+            download: Optional callable(url, title, entries, playlist_count) used instead of
+                downloader.download_entries, returning a result with a 'failed' list and
+                optionally a 'pending' list of video IDs that are queued but not downloaded yet
+        """
+        self.downloader = downloader
+        self.download_func = download
+        self.state_file = Path(state_file) if state_file else downloader.output_dir / self.STATE_FILENAME
+        self.default_interval = default_interval
+        self.lock = Lock()
+        self.stop_event = Event()
+        self.next_due = {}
+        self.state = self.load_state()
+    
+    def load_state(self):
+        """Load the playlist snapshots from the state file"""
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                state.setdefault('playlists', {})
+                return state
+            except (OSError, ValueError):
+                print(f"Warning: Could not read watch state from {self.state_file}, starting fresh")
+        return {'playlists': {}}
+    
+    def save_state(self):
+        """Write the playlist snapshots to the state file atomically"""
+        tmp_file = self.state_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_file, self.state_file)
+    
+    def add_playlist(self, url, interval=None):
+        """Start watching a playlist (interval in minutes)"""
+        with self.lock:
+            entry = self.state['playlists'].setdefault(url, {
+                'title': '',
+                'ids': [],
+                'last_poll': None,
+                'last_stats': None,
+            })
+            entry['interval'] = interval or self.default_interval
+            self.next_due.setdefault(url, 0)
+            self.save_state()
+    
+    def remove_playlist(self, url):
+        """Stop watching a playlist and forget its snapshot"""
+        with self.lock:
+            removed = self.state['playlists'].pop(url, None) is not None
+            self.next_due.pop(url, None)
+            if removed:
+                self.save_state()
+            return removed
+    
+    def get_playlists(self):
+        """Return a summary of all watched playlists"""
+        with self.lock:
+            return [{
+                'url': url,
+                'title': entry.get('title', ''),
+                'interval': entry.get('interval', self.default_interval),
+                'known_items': len(entry.get('ids', [])),
+                'last_poll': entry.get('last_poll'),
+                'last_stats': entry.get('last_stats'),
+            } for url, entry in self.state['playlists'].items()]
+    
+    def download(self, url, title, entries, playlist_count):
+        """Download a playlist's new entries, given as (playlist index, entry) tuples"""
+        if self.download_func:
+            return self.download_func(url, title, entries, playlist_count)
+        return self.downloader.download_entries(title, entries, playlist_count)
+    
+    def poll_playlist(self, url):
+        """
+        Poll one playlist, download its new entries and update the snapshot
+        
+        Returns:
+            Dictionary with the poll cost (entries scanned, new/removed items, time taken)
+        """
+        started = time.perf_counter()
+        title, entries = list_playlist_entries(url)
+        ids = [entry['id'] for entry in entries]
+        listed = time.perf_counter()
+        
+        with self.lock:
+            known_ids = set(self.state['playlists'].get(url, {}).get('ids', []))
+        current_ids = set(i for i in ids if i)
+        # Entries are downloaded by video URL, not by position, so the
+        # playlist can change between this listing and the download
+        new_entries = [(index, entry) for index, entry in select_playlist_entries(entries)
+                       if entry['id'] and entry['id'] not in known_ids]
+        removed_count = len(known_ids - current_ids)
+        
+        failed = []
+        pending = []
+        if new_entries:
+            result = self.download(url, title, new_entries, len(entries))
+            failed = result.get('failed', [])
+            pending = result.get('pending', [])
+        # Only transient failures are retried by the next poll; unavailable
+        # entries stay in the snapshot so they are not fetched again. Entries
+        # still pending are checked again by the next poll as well.
+        retry_ids = set(item['id'] for item in failed if item['error_class'] in RETRYABLE_ERRORS)
+        retry_ids.update(pending)
+        
+        stats = {
+            'scanned': len(ids),
+            'new': len(new_entries),
+            'removed': removed_count,
+            'failed': len(failed),
+            'list_seconds': round(listed - started, 3),
+            'total_seconds': round(time.perf_counter() - started, 3),
+        }
+        
+        with self.lock:
+            entry = self.state['playlists'].get(url)
+            if entry is not None:
+                entry['title'] = title
+                entry['ids'] = [i for i in ids if i and i not in retry_ids]
+                entry['last_poll'] = time.time()
+                entry['last_stats'] = stats
+                self.save_state()
+        
+        print(
+            f"[watch] {title}: scanned {stats['scanned']} entries, "
+            f"{stats['new']} new, {stats['removed']} removed, {stats['failed']} failed "
+            f"in {stats['total_seconds']:.1f}s (listing {stats['list_seconds']:.1f}s)"
+        )
+        return stats
+    
+    def poll_due(self):
+        """Poll every playlist whose interval has elapsed"""
+        now = time.monotonic()
+        with self.lock:
+            due = [url for url in self.state['playlists'] if self.next_due.get(url, 0) <= now]
+        for url in due:
+            if self.stop_event.is_set():
+                break
+            try:
+                self.poll_playlist(url)
+            except Exception as e:
+                print(f"[watch] Error polling {url}: {e}")
+            with self.lock:
+                entry = self.state['playlists'].get(url)
+                if entry is not None:
+                    self.next_due[url] = time.monotonic() + entry.get('interval', self.default_interval) * 60
+    
+    def run(self):
+        """Poll playlists until stop() is called"""
+        while not self.stop_event.is_set():
+            self.poll_due()
+            with self.lock:
+                pending = [self.next_due.get(url, 0) for url in self.state['playlists']]
+            wait = min(pending) - time.monotonic() if pending else self.default_interval * 60
+            # Wake up at least once a minute so newly added playlists are picked up
+            self.stop_event.wait(max(1, min(wait, 60)))
+    
+    def stop(self):
+        """Ask run() to return after the current poll"""
+        self.stop_event.set()
+
+
 def main():
     """CLI interface for the downloader"""
     import argparse
@@ -360,12 +1950,16 @@ Examples:
   
   # Custom bitrate
   python youtube_downloader.py "URL" --bitrate "192k"
+  
+  # Keep playlists in sync, checking for new videos every 30 minutes
+  python youtube_downloader.py "PLAYLIST_URL_1" "PLAYLIST_URL_2" --watch --interval 30
         """
     )
     
     parser.add_argument(
         'url',
-        help='YouTube video or playlist URL'
+        nargs='+',
+        help='YouTube video or playlist URL(s)'
     )
     
     parser.add_argument(
@@ -380,6 +1974,37 @@ Examples:
         help='Audio bitrate for MP3 conversion (default: 172k)'
     )
     
+    parser.add_argument(
+        '--staging-dir', '-s',
+        default=None,
+        help='Local scratch directory for downloading and converting; only finished files are moved to the output directory'
+    )
+    
+    parser.add_argument(
+        '--normalize', '-n',
+        action='store_true',
+        help='Normalize loudness (two-pass EBU R128); measurements are cached per video'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Profile the download and save pstats, collapsed-stack and summary files under the output directory'
+    )
+    
+    parser.add_argument(
+        '--watch', '-w',
+        action='store_true',
+        help='Watch the given playlists and download new videos as they appear'
+    )
+    
+    parser.add_argument(
+        '--interval', '-i',
+        type=float,
+        default=60,
+        help='Minutes between playlist checks in watch mode (default: 60)'
+    )
+    
     args = parser.parse_args()
     
     # Validate bitrate format
@@ -389,17 +2014,60 @@ Examples:
     
     downloader = YouTubeDownloader(
         output_dir=args.output,
-        bitrate=args.bitrate
+        bitrate=args.bitrate,
+        staging_dir=args.staging_dir,
+        normalize=args.normalize
     )
     
+    def report(data):
+        """Print throttling and retry notices"""
+        if data['status'] == 'throttled':
+            print(f"Throttling detected on {data['extractor']}, pausing downloads for {data['wait']:.0f}s")
+        elif data['status'] == 'retrying':
+            print(f"Retrying {data['retry_items']} failed item(s) in {data['wait']:.0f}s "
+                  f"(attempt {data['attempt']}/{data['max_attempts']})")
+    
+    downloader.set_progress_callback(report)
+    
+    if args.watch:
+        watcher = PlaylistWatcher(downloader, default_interval=args.interval)
+        for url in args.url:
+            watcher.add_playlist(url, interval=args.interval)
+        print(f"Watching {len(args.url)} playlist(s) every {args.interval:g} minute(s). Press Ctrl+C to stop.")
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            watcher.stop()
+            print("\nStopped watching.")
+        return
+    
     try:
-        result = downloader.download(args.url)
-        print(f"\n{'='*60}")
-        print("Download and conversion completed successfully!")
-        print(f"Type: {result['type']}")
-        print(f"Title: {result['title']}")
-        print(f"Files saved to: {result['output_dir']}")
-        print(f"{'='*60}\n")
+        for url in args.url:
+            result = downloader.download(url, profile=args.profile)
+            print(f"\n{'='*60}")
+            print("Download and conversion completed successfully!")
+            print(f"Type: {result['type']}")
+            print(f"Title: {result['title']}")
+            print(f"Files saved to: {result['output_dir']}")
+            if result['failed']:
+                print(f"Failed items ({len(result['failed'])}):")
+                for item in result['failed']:
+                    label = item['title'] or item['id']
+                    print(f"  - {label}: {item['error_class']} after {item['attempts']} attempt(s)")
+            if 'normalization' in result:
+                normalization = result['normalization']
+                print(f"Normalization: {len(normalization['items'])} file(s), "
+                      f"{normalization['cache_hits']} from cache, "
+                      f"{normalization['analysis_seconds']:.1f}s analysis, "
+                      f"{normalization['encode_seconds']:.1f}s encoding")
+            if 'profile' in result:
+                profile = result['profile']
+                print(f"Profile: {profile['wall_seconds']:.1f}s wall, "
+                      f"{profile['python_cpu_seconds']:.1f}s Python CPU, "
+                      f"{profile['network_wait_seconds']:.1f}s network wait, "
+                      f"{profile['ffmpeg_wall_seconds']:.1f}s in FFmpeg")
+                print(f"Profile saved to: {Path(profile['artifacts']['summary']).parent}")
+            print(f"{'='*60}\n")
     except Exception as e:
         print(f"\nError: {e}")
         sys.exit(1)